@@ -0,0 +1,261 @@
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+import fontforge
+from fontforge import font as Font
+
+from .modify_bizud import modify_bizud_upright
+from .parameter import GlyphShape
+from .utils import (
+    BBoxIndex,
+    align_center,
+    copy_glyph,
+    copy_glyph_range,
+    create_font,
+    draw_square,
+    fit,
+    get_mode_box,
+    log,
+    resize_width,
+)
+
+SYNTHETIC_START = 0xF0000  # Supplementary Private Use Area-A
+SYNTHETIC_SHAPE = GlyphShape(ascent=880, descent=120, half_width=500, full_width=1000)
+TARGET_SHAPE = GlyphShape(ascent=864, descent=216, half_width=540, full_width=1080)
+
+Benchmark = Callable[[Font], None]
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def benchmark(name: str) -> Callable[[Benchmark], Benchmark]:
+    def register(func: Benchmark) -> Benchmark:
+        BENCHMARKS[name] = func
+        return func
+
+    return register
+
+
+def create_synthetic_font(num_glyphs: int) -> Font:
+    """Font of hollow squares, alternating half and full width like BIZUD."""
+    font = create_font(
+        encoding="UnicodeFull",
+        ascent=SYNTHETIC_SHAPE.ascent,
+        descent=SYNTHETIC_SHAPE.descent,
+    )
+    for i in range(num_glyphs):
+        width = SYNTHETIC_SHAPE.full_width if i % 2 else SYNTHETIC_SHAPE.half_width
+        glyph = font.createChar(SYNTHETIC_START + i)
+        pen = glyph.glyphPen()
+        draw_square(pen, (50, -50), width - 150, 800)
+        draw_square(pen, (150, 50), width - 350, 600, erase=True)
+        pen = None
+        glyph.width = width
+
+    return font
+
+
+def synthetic_glyphs(font: Font) -> list:
+    return [glyph for glyph in font.glyphs() if glyph.width]
+
+
+@benchmark("fit")
+def bench_fit(font: Font) -> None:
+    for glyph in synthetic_glyphs(font):
+        fit(glyph, TARGET_SHAPE.half_width, TARGET_SHAPE.ascent, TARGET_SHAPE.descent)
+
+
+@benchmark("resize_width")
+def bench_resize_width(font: Font) -> None:
+    for glyph in synthetic_glyphs(font):
+        resize_width(glyph, TARGET_SHAPE.half_width)
+
+
+@benchmark("align_center")
+def bench_align_center(font: Font) -> None:
+    for glyph in synthetic_glyphs(font):
+        align_center(glyph)
+
+
+@benchmark("get_mode_box")
+def bench_get_mode_box(font: Font) -> None:
+    get_mode_box(synthetic_glyphs(font))
+
+
+@benchmark("bbox_index")
+def bench_bbox_index(font: Font) -> None:
+    index = BBoxIndex(synthetic_glyphs(font))
+    index.max_width()
+    index.mode_box()
+    index.global_box()
+
+
+@benchmark("copy_glyph")
+def bench_copy_glyph(font: Font) -> None:
+    dst = create_font(encoding="UnicodeFull")
+    for glyph in synthetic_glyphs(font):
+        copy_glyph((font, glyph.unicode), (dst, glyph.unicode), replace=True)
+    dst.close()
+
+
+@benchmark("copy_glyph_range")
+def bench_copy_glyph_range(font: Font) -> None:
+    dst = create_font(encoding="UnicodeFull")
+    stop = max(glyph.unicode for glyph in synthetic_glyphs(font))
+    copy_glyph_range((font, (SYNTHETIC_START, stop)), (dst, SYNTHETIC_START), True)
+    dst.close()
+
+
+@benchmark("modify_bizud")
+def bench_modify_bizud(font: Font) -> None:
+    modify_bizud_upright(
+        font,
+        SYNTHETIC_SHAPE,
+        TARGET_SHAPE,
+        visualize_zenkaku_space=False,
+        baseline_shift=98,
+        weight=20,
+    )
+
+
+@benchmark("mergeFonts")
+def bench_merge_fonts(font: Font) -> None:
+    dst = create_font(encoding="UnicodeFull")
+    dst.mergeFonts(font)
+    dst.close()
+
+
+@benchmark("generate")
+def bench_generate(font: Font) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        font.generate(str(Path(tmp_dir) / "synthetic.ttf"))
+
+
+def run_benchmarks(
+    num_glyphs: int,
+    repeat: int,
+    names: list[str] | None = None,
+) -> dict[str, float]:
+    """Best wall time in seconds of each benchmark, excluding font setup."""
+    results = {}
+    for name, func in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+
+        timings = []
+        for _ in range(repeat):
+            font = create_synthetic_font(num_glyphs)
+            start = time.perf_counter()
+            func(font)
+            timings.append(time.perf_counter() - start)
+            font.close()
+
+        results[name] = min(timings)
+        per_glyph = results[name] / num_glyphs * 1e6
+        log(f"  {name}: {results[name]:.3f}s ({per_glyph:.1f} us/glyph)")
+
+    return results
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Names of the benchmarks that got slower than `threshold` (e.g. 0.1 = 10%)."""
+    if baseline["meta"]["glyphs"] != current["meta"]["glyphs"]:
+        log("  warning: baselines were taken with different glyph counts")
+
+    regressions = []
+    for name, seconds in current["results"].items():
+        if name not in baseline["results"]:
+            log(f"  {name}: {seconds:.3f}s (new)")
+            continue
+
+        ratio = seconds / baseline["results"][name]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- regression"
+            regressions.append(name)
+        log(
+            f"  {name}: {baseline['results'][name]:.3f}s -> {seconds:.3f}s "
+            + f"({ratio:.2f}x){flag}"
+        )
+
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark on synthetic fonts.",
+        usage="python -m src.benchmark run --glyphs N --output baseline.json"
+        + " | python -m src.benchmark compare baseline.json current.json",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run benchmarks.")
+    run_parser.add_argument(
+        "--glyphs",
+        type=int,
+        default=5000,
+        help="Number of synthetic glyphs. BIZUD has about 20000.",
+    )
+    run_parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Runs per benchmark, the best one is kept.",
+    )
+    run_parser.add_argument(
+        "--only",
+        type=str,
+        nargs="+",
+        choices=list(BENCHMARKS),
+        help="Run only these benchmarks.",
+    )
+    run_parser.add_argument(
+        "--output",
+        type=str,
+        required=False,
+        help="Save results as json.",
+    )
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two results.")
+    compare_parser.add_argument("baseline", type=str, help="Baseline json.")
+    compare_parser.add_argument("current", type=str, help="Current json.")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Allowed slowdown ratio.",
+    )
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.command == "run":
+        log(f"Benchmark with {args.glyphs} glyphs")
+        results = run_benchmarks(args.glyphs, args.repeat, args.only)
+        if args.output is not None:
+            meta = {
+                "glyphs": args.glyphs,
+                "fontforge": fontforge.version(),
+                "python": platform.python_version(),
+                "date": datetime.now().isoformat(timespec="seconds"),
+            }
+            with open(args.output, "w") as f:
+                json.dump({"meta": meta, "results": results}, f, indent=2)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+
+        log(f"Compare {args.baseline} -> {args.current}")
+        if compare(baseline, current, args.threshold):
+            sys.exit(1)
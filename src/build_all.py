@@ -0,0 +1,538 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Iterator
+
+from .log import log
+from .manifest import SRC_DIR, BuildManifest, hash_code, hash_file, read_env
+from .parameter import GlyphShape, Parameter
+
+ENV_KEYS = ["VERSION", "HACK_VERSION", "BIZUD_VERSION", "NERD_VERSION"]
+
+# peak RSS assumed for a variant never built before, in KiB
+DEFAULT_PEAK_RSS = 4 * 1024 * 1024
+
+_print_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class BuildJob:
+    name: str
+    parameter_file: Path
+    upright_key: str
+    skew: float
+    font_name: str
+    sources: tuple[str, ...]
+    shape_to: GlyphShape
+
+    @classmethod
+    def from_file(cls, path: Path) -> "BuildJob":
+        with open(path) as f:
+            parameter = Parameter.from_dict(json.load(f))
+
+        return cls(
+            path.stem,
+            path,
+            upright_key(parameter),
+            parameter.skew,
+            f"{parameter.family_name}-{parameter.style_name}".replace(" ", ""),
+            (parameter.hack.source, parameter.bizud.source, parameter.nerd.source),
+            parameter.shape_to,
+        )
+
+
+def upright_key(parameter: Parameter) -> str:
+    # everything the cached upright stages depend on; skew is applied afterwards
+    upright = {
+        "shape_to": asdict(parameter.shape_to),
+        "hack": asdict(parameter.hack),
+        "bizud": asdict(parameter.bizud),
+        "coverage": asdict(parameter.coverage) if parameter.coverage else None,
+    }
+    return hashlib.sha256(json.dumps(upright, sort_keys=True).encode()).hexdigest()
+
+
+def group_jobs(jobs: list[BuildJob]) -> list[list[BuildJob]]:
+    """Group variants sharing the upright stages, upright variant first."""
+    groups: dict[str, list[BuildJob]] = {}
+    for job in jobs:
+        groups.setdefault(job.upright_key, []).append(job)
+
+    return [sorted(group, key=lambda job: job.skew != 0) for group in groups.values()]
+
+
+@dataclass(frozen=True)
+class BuildResult:
+    job: BuildJob
+    returncode: int
+    attempts: int
+    elapsed: float
+    peak_rss: int  # KiB, the largest over the attempts
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+def emit(prefix: str, line: str) -> None:
+    with _print_lock:
+        print(f"[{prefix}] {line}", end="" if line.endswith("\n") else "\n")
+        sys.stdout.flush()
+
+
+def build_command(job: BuildJob, builder_args: list[str]) -> list[str]:
+    return [
+        sys.executable,
+        "-m",
+        "src.build_pennywort",
+        *builder_args,
+        str(job.parameter_file),
+    ]
+
+
+def run_once(job: BuildJob, builder_args: list[str]) -> tuple[int, int]:
+    """Exit code and peak RSS in KiB of one build."""
+    # Each variant gets its own interpreter so that a crash inside fontforge
+    # only takes down that variant.
+    proc = subprocess.Popen(
+        build_command(job, builder_args),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+        env={**os.environ, "PYTHONUNBUFFERED": "1"},
+    )
+    assert proc.stdout is not None
+    for line in proc.stdout:
+        emit(job.name, line)
+
+    # reap the child ourselves to get its resource usage
+    _, status, rusage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return proc.returncode, rusage.ru_maxrss
+
+
+def run_job(job: BuildJob, builder_args: list[str], retries: int) -> BuildResult:
+    start = time.monotonic()
+    returncode = 0
+    attempt = 0
+    peak_rss = 0
+    for attempt in range(1, retries + 2):
+        returncode, rss = run_once(job, builder_args)
+        peak_rss = max(peak_rss, rss)
+        if returncode == 0:
+            break
+
+        emit(job.name, f"Failed with exit code {returncode} (attempt {attempt})")
+
+    return BuildResult(job, returncode, attempt, time.monotonic() - start, peak_rss)
+
+
+class MemoryBudget:
+    """Admits jobs while the sum of their estimated peak RSS fits in `budget`.
+
+    A job is always admitted when nothing else runs, so that a job larger than
+    the budget still runs, alone.
+    """
+
+    def __init__(self, budget: int) -> None:
+        self.budget = budget
+        self.used = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def reserve(self, amount: int) -> Iterator[None]:
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self.used == 0 or self.used + amount <= self.budget
+            )
+            self.used += amount
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.used -= amount
+                self._condition.notify_all()
+
+
+def build_all(
+    jobs: list[BuildJob],
+    builder_args: list[str],
+    workers: int,
+    retries: int = 1,
+    budget: MemoryBudget | None = None,
+    estimates: dict[BuildJob, int] | None = None,
+) -> list[BuildResult]:
+    # Variants that only differ in skew wait for the first variant of their
+    # group, so that they load its upright stages from the cache and only
+    # apply the skew pass.
+    slots = threading.BoundedSemaphore(workers)
+    leader_done: dict[BuildJob, threading.Event] = {}
+    waits_for: dict[BuildJob, threading.Event] = {}
+    for leader, *followers in group_jobs(jobs):
+        leader_done[leader] = threading.Event()
+        for follower in followers:
+            waits_for[follower] = leader_done[leader]
+
+    def run(job: BuildJob) -> BuildResult:
+        if job in waits_for:
+            waits_for[job].wait()
+        try:
+            with slots:
+                if budget is None:
+                    return run_job(job, builder_args, retries)
+
+                estimate = (estimates or {}).get(job, DEFAULT_PEAK_RSS)
+                with budget.reserve(estimate):
+                    return run_job(job, builder_args, retries)
+        finally:
+            if job in leader_done:
+                leader_done[job].set()
+
+    with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+        return list(executor.map(run, jobs))
+
+
+def build_nerd_shapes(jobs: list[BuildJob], src_dir: Path, workers: int) -> None:
+    """Fit the Nerd Font to each distinct shape once, before the variants need it.
+
+    The styles of a family share a shape, so they share one fitted font.
+    """
+    # fontforge is only needed here, the rest of the driver runs without it
+    from .build_nerd import build_shaped_nerd
+
+    shapes = {(job.sources[2], job.shape_to) for job in jobs}
+    with ProcessPoolExecutor(min(workers, len(shapes))) as executor:
+        for future in [
+            executor.submit(build_shaped_nerd, src_dir / source, shape_to)
+            for source, shape_to in shapes
+        ]:
+            future.result()
+
+
+def run_export(font_path: Path, html_path: Path, jobs: int) -> int:
+    return subprocess.call(
+        [
+            sys.executable,
+            "-m",
+            "src.export_html",
+            str(font_path.resolve()),
+            "--output",
+            str(html_path.resolve()),
+            "--jobs",
+            str(jobs),
+        ],
+        cwd=SRC_DIR.parent,
+    )
+
+
+def font_inputs(job: BuildJob, args: argparse.Namespace) -> dict[str, str]:
+    env = read_env(Path(args.env_file)) if Path(args.env_file).exists() else {}
+    inputs = {
+        "parameter": hash_file(job.parameter_file),
+        "code": hash_code(),
+        "version": args.version,
+        "license_url": args.license_url or "",
+        **{f"env:{key}": env.get(key, "") for key in ENV_KEYS},
+        **{
+            f"source:{source}": hash_file(Path(args.src_dir) / source)
+            for source in job.sources
+        },
+    }
+    if args.copyright_file is not None:
+        inputs["copyright"] = hash_file(Path(args.copyright_file))
+
+    return inputs
+
+
+def select_stale(
+    manifest: BuildManifest,
+    outputs: dict[Path, dict[str, str]],
+    force: bool,
+) -> list[Path]:
+    stale = []
+    for output, inputs in outputs.items():
+        reason = "forced" if force else manifest.check(output, inputs)
+        if reason is None:
+            log(f"Skip {output}: up to date")
+        else:
+            log(f"Build {output}: {reason}")
+            stale.append(output)
+
+    return stale
+
+
+def format_size(size: int, previous_size: int | None) -> str:
+    text = f"{size / 2**20:.1f} MiB"
+    if previous_size is not None and previous_size != size:
+        text += f" ({(size - previous_size) / 2**20:+.1f} MiB)"
+
+    return text
+
+
+def print_summary(
+    results: list[BuildResult],
+    outputs: list[Path],
+    previous_sizes: dict[Path, int],
+    wall_time: float,
+) -> None:
+    log("Summary")
+    for result, output in zip(results, outputs):
+        status = "ok" if result.ok else f"FAILED ({result.returncode})"
+        if result.ok and output.exists():
+            size = format_size(output.stat().st_size, previous_sizes.get(output))
+            status += f", {size}"
+        log(
+            f"  {result.job.name}: {status}, "
+            + f"{result.elapsed:.1f}s, {result.attempts} attempt(s), "
+            + f"peak RSS {result.peak_rss / 1024:.0f} MiB"
+        )
+
+    cpu_time = sum(result.elapsed for result in results)
+    log(f"  wall time: {wall_time:.1f}s (sum of variants: {cpu_time:.1f}s)")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Build all Pennywort variants in parallel.",
+        usage="python -m src.build_all"
+        + "--src-dir /path/to/source_fonts"
+        + "--jobs N"
+        + "/path/to/parameter/json ...",
+    )
+
+    parser.add_argument(
+        "--src-dir",
+        type=str,
+        required=True,
+        help="Where the source fonts.",
+    )
+    parser.add_argument(
+        "--dst-dir",
+        type=str,
+        default="./dist",
+        help="Output destination.",
+    )
+    parser.add_argument(
+        "--version",
+        type=str,
+        default="1.000",
+        help="Font version.",
+    )
+    parser.add_argument(
+        "--copyright-file",
+        type=str,
+        required=False,
+        help="Copyright file.",
+    )
+    parser.add_argument(
+        "--license-url",
+        type=str,
+        required=False,
+        help="License URL.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of variants built at once. Defaults to the number of CPUs.",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=1,
+        help="How many times a failed variant is retried.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default="./tmp/cache",
+        help="Where the intermediate fonts are cached.",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=4096,
+        help="Cache size limit in MiB.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not reuse stages from previous builds.",
+    )
+    parser.add_argument(
+        "--weight-shards",
+        type=int,
+        default=1,
+        help="Number of processes applying changeWeight to BIZUD in each variant.",
+    )
+    parser.add_argument(
+        "--low-memory",
+        action="store_true",
+        help="Build each variant merging and closing one source font at a time.",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        required=False,
+        help="Only start a variant while the peak RSS of the running ones, "
+        + "as recorded in the manifest, fits in this many MiB.",
+    )
+    parser.add_argument(
+        "--preview-dir",
+        type=str,
+        required=False,
+        help="Also export an html preview of every font into this directory.",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        default="./dist/manifest.json",
+        help="Build manifest recording the inputs of every output.",
+    )
+    parser.add_argument(
+        "--env-file",
+        type=str,
+        default="./.env",
+        help="File defining the source font versions.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild every output even if its inputs are unchanged.",
+    )
+    parser.add_argument(
+        "parameter_files",
+        type=str,
+        nargs="+",
+        help="Paths to parameter.json.",
+    )
+
+    return parser.parse_args()
+
+
+def builder_args_from(args: argparse.Namespace) -> list[str]:
+    builder_args = [
+        "--src-dir",
+        args.src_dir,
+        "--dst-dir",
+        args.dst_dir,
+        "--version",
+        args.version,
+        "--cache-dir",
+        args.cache_dir,
+        "--cache-size",
+        str(args.cache_size),
+        "--weight-shards",
+        str(args.weight_shards),
+    ]
+    if args.copyright_file is not None:
+        builder_args += ["--copyright-file", args.copyright_file]
+    if args.license_url is not None:
+        builder_args += ["--license-url", args.license_url]
+    if args.low_memory:
+        builder_args += ["--low-memory"]
+
+    return builder_args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    start = time.monotonic()
+    manifest = BuildManifest(Path(args.manifest))
+    jobs = {
+        Path(args.dst_dir) / f"{job.font_name}.ttf": job
+        for job in map(BuildJob.from_file, map(Path, args.parameter_files))
+    }
+    inputs = {output: font_inputs(job, args) for output, job in jobs.items()}
+    stale = select_stale(manifest, inputs, args.force)
+
+    results = []
+    # to report what a coverage or parameter change saved
+    previous_sizes = {
+        output: output.stat().st_size for output in stale if output.exists()
+    }
+    if stale:
+        workers = min(args.jobs or os.cpu_count() or 1, len(stale))
+        with tempfile.TemporaryDirectory() as tmp_cache_dir:
+            # Without the persistent cache, the variants of a run still share
+            # their upright stages through a throwaway one.
+            if args.no_cache:
+                args.cache_dir = tmp_cache_dir
+
+            budget = None
+            if args.memory_budget is not None:
+                budget = MemoryBudget(args.memory_budget * 1024)
+            # the peak of the last build of each variant, or of the largest one
+            recorded = {jobs[output]: manifest.peak_rss(output) for output in stale}
+            known = [rss for rss in recorded.values() if rss is not None]
+            fallback = max(known) if known else DEFAULT_PEAK_RSS
+            estimates = {job: rss or fallback for job, rss in recorded.items()}
+
+            build_nerd_shapes(
+                [jobs[output] for output in stale], Path(args.src_dir), workers
+            )
+
+            log(f"Build {len(stale)} variant(s) with {workers} worker(s)")
+            builder_args = builder_args_from(args)
+            results = build_all(
+                [jobs[output] for output in stale],
+                builder_args,
+                workers,
+                args.retries,
+                budget,
+                estimates,
+            )
+
+        for output, result in zip(stale, results):
+            if result.ok:
+                manifest.record(output, inputs[output], result.peak_rss)
+        manifest.save()
+
+    failed = {output for output, result in zip(stale, results) if not result.ok}
+    if args.preview_dir is not None:
+        export_html_code = hash_code(modules=["export_html.py", "webfont.py"])
+        previews = {
+            Path(args.preview_dir) / f"{job.name}.html": {
+                "font": hash_file(output),
+                "code": export_html_code,
+            }
+            for output, job in jobs.items()
+            if output not in failed and output.exists()
+        }
+        fonts = {
+            Path(args.preview_dir) / f"{job.name}.html": output
+            for output, job in jobs.items()
+        }
+        stale_previews = select_stale(manifest, previews, args.force)
+        workers = args.jobs or os.cpu_count() or 1
+        # each export builds its WOFF2 subsets with a share of the CPUs
+        subset_jobs = max(1, workers // max(1, len(stale_previews)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            returncodes = executor.map(
+                lambda html: run_export(fonts[html], html, subset_jobs),
+                stale_previews,
+            )
+            for html, returncode in zip(stale_previews, returncodes):
+                if returncode == 0:
+                    manifest.record(html, previews[html])
+                else:
+                    log(f"Failed to export {html}")
+                    failed.add(html)
+        manifest.save()
+
+    print_summary(results, stale, previous_sizes, time.monotonic() - start)
+
+    if failed:
+        sys.exit(1)
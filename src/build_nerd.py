@@ -1,24 +1,22 @@
 import argparse
-from dataclasses import dataclass
+import json
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
 from pathlib import Path
 from typing import Literal
 
 import fontforge
-import psMat
 from dataclasses_json import DataClassJsonMixin
 from fontforge import font as Font
 from fontforge import glyph as Glyph
 
-from .utils import (
-    align_center,
-    copy_glyph,
-    create_font,
-    get_global_box,
-    get_max_height,
-    get_max_width,
-    get_mode_box,
-    log,
-)
+from .manifest import SRC_DIR, hash_file
+from .parameter import Coverage, GlyphShape
+from .stage_cache import hash_config
+from .tracing import Span, count, stage, tracer
+from .utils import BBoxIndex, TransformPlan, copy_glyphs, create_font, log
 
 FitTarget = Literal["max_width", "max_height"] | float
 HorizontalAlign = Literal["center"] | None
@@ -42,6 +40,18 @@ class FontMap(DataClassJsonMixin):
     def bulk_create(cls, kvs: list[dict]) -> list["FontMap"]:
         return [cls.from_dict(kv) for kv in kvs]
 
+    def mapping(self, coverage: Coverage | None = None) -> dict[int, int]:
+        """{src: dst} of the glyph maps, restricted to the covered destinations."""
+        mapping = {}
+        for glyph_map in self.glyph_maps:
+            start, stop = glyph_map.src_range
+            for src in range(start, stop + 1):
+                dst = glyph_map.dst_start + src - start
+                if coverage is None or coverage.covers(dst):
+                    mapping[src] = dst
+
+        return mapping
+
 
 GLYPH_SETS = FontMap.bulk_create(
     [
@@ -213,44 +223,73 @@ def modify(
     fit_target: FitTarget,
     halign: HorizontalAlign,
     valign: VerticalAlign,
+    covered: set[int] | None = None,
 ) -> None:
+    """Fit `glyphs` as one set.
+
+    With `covered`, only those source codepoints are moved. The fit is still
+    measured on the whole set, so icons keep their size whatever is excluded.
+    """
+    index = BBoxIndex(glyphs)
     if fit_target == "max_width":
-        max_width = get_max_width(glyphs)
+        max_width = index.max_width()
         scale = width / max_width
     elif fit_target == "max_height":
-        max_height = get_max_height(glyphs)
+        max_height = index.max_height()
         scale = (ascent + descent) / max_height
     else:
         scale = width / fit_target
 
     if valign == "baseline":
-        _, mode_bottom, _, _ = get_mode_box(glyphs)
+        _, mode_bottom, _, _ = index.mode_box()
         shift_y = -mode_bottom * scale
     else:
-        _, _, _, max_top = get_global_box(glyphs)
+        _, _, _, max_top = index.global_box()
         shift_y = ascent - max_top * scale
 
-    for glyph in glyphs:
-        glyph.transform(psMat.scale(scale))
-        glyph.transform(psMat.translate((0, shift_y)))
-        glyph.width = width
+    fit_glyphs(glyphs, index, scale, shift_y, width, halign, covered)
+
+
+def fit_glyphs(
+    glyphs: list[Glyph],
+    index: BBoxIndex,
+    scale: float,
+    shift_y: float,
+    width: int,
+    halign: HorizontalAlign,
+    covered: set[int] | None = None,
+) -> None:
+    """Scale and shift `glyphs` into cells of `width`, one transform each."""
+    for i, glyph in enumerate(glyphs):
+        if covered is not None and glyph.unicode not in covered:
+            continue
+
+        plan = TransformPlan(glyph, index.box(i))
+        plan.scale(scale).translate(0, shift_y).set_width(width)
         if halign == "center":
-            align_center(glyph)
+            plan.align_center()
+        plan.apply()
 
 
-def build_nerd(source_fonts_dir: Path, ascent: int, descent: int, width: int) -> Font:
-    name = "NerdFont"
-    nerd = create_font(
-        fontname=name,
-        fullname=name,
-        familyname=name,
-        encoding="UnicodeFull",
-        ascent=ascent,
-        descent=descent,
-    )
+def build_partial(
+    glyph_set: FontMap,
+    source_fonts_dir: Path,
+    partial_path: Path,
+    ascent: int,
+    descent: int,
+    width: int,
+    coverage: Coverage | None = None,
+) -> list[Span]:
+    """Fit and copy one glyph set into a partial font saved as `partial_path`.
 
-    for glyph_set in GLYPH_SETS:
-        src_font = fontforge.open(str(source_fonts_dir / glyph_set.source))
+    Returns the trace spans recorded by the worker.
+    """
+    first_span = len(tracer.spans)
+    with stage(f"glyph set {glyph_set.source}"):
+        partial = create_font(encoding="UnicodeFull", ascent=ascent, descent=descent)
+
+        with stage(f"open {glyph_set.source}"):
+            src_font = fontforge.open(str(source_fonts_dir / glyph_set.source))
         glyphs = list(
             {
                 src_font[unicode].unicode: src_font[unicode]
@@ -267,33 +306,196 @@ def build_nerd(source_fonts_dir: Path, ascent: int, descent: int, width: int) ->
         log(f"  width: {width}")
         log(f"  halign: {glyph_set.halign}")
         log(f"  valign: {glyph_set.valign}")
-        modify(
-            glyphs,
-            ascent,
-            descent,
-            width,
-            glyph_set.fit_target,
-            glyph_set.halign,
-            glyph_set.valign,
-        )
+        mapping = glyph_set.mapping(coverage)
+        with stage("modify"):
+            modify(
+                glyphs,
+                ascent,
+                descent,
+                width,
+                glyph_set.fit_target,
+                glyph_set.halign,
+                glyph_set.valign,
+                None if coverage is None else set(mapping),
+            )
+            count(glyphs=len(mapping))
 
-        for glyph_map in glyph_set.glyph_maps:
-            start, stop = glyph_map.src_range
-            log(f"Copy {hex(start)}~{hex(stop)} -> {hex(glyph_map.dst_start)}~")
-
-            for i, src_unicode in enumerate(range(start, stop + 1)):
-                if src_unicode in src_font:
-                    copy_glyph(
-                        (src_font, src_unicode),
-                        (nerd, glyph_map.dst_start + i),
-                        replace=True,
-                    )
+        with stage("copy"):
+            for glyph_map in glyph_set.glyph_maps:
+                start, stop = glyph_map.src_range
+                log(f"Copy {hex(start)}~{hex(stop)} -> {hex(glyph_map.dst_start)}~")
+            copy_glyphs(src_font, partial, mapping, replace=True)
+            count(glyphs=len(mapping))
 
         src_font.close()
 
+        with stage("save partial"):
+            partial.save(str(partial_path))
+        partial.close()
+
+    return tracer.spans[first_span:]
+
+
+def build_nerd(
+    source_fonts_dir: Path,
+    ascent: int,
+    descent: int,
+    width: int,
+    jobs: int | None = None,
+    coverage: Coverage | None = None,
+) -> Font:
+    name = "NerdFont"
+    nerd = create_font(
+        fontname=name,
+        fullname=name,
+        familyname=name,
+        encoding="UnicodeFull",
+        ascent=ascent,
+        descent=descent,
+    )
+
+    glyph_sets = [glyph_set for glyph_set in GLYPH_SETS if glyph_set.mapping(coverage)]
+    for glyph_set in GLYPH_SETS:
+        if glyph_set not in glyph_sets:
+            log(f"Skip {glyph_set.source}, not covered")
+
+    with (
+        tempfile.TemporaryDirectory() as tmp_dir,
+        ProcessPoolExecutor(jobs) as executor,
+    ):
+        partials = [Path(tmp_dir) / f"{i:02}.sfd" for i in range(len(glyph_sets))]
+        futures = [
+            executor.submit(
+                build_partial,
+                glyph_set,
+                source_fonts_dir,
+                partial_path,
+                ascent,
+                descent,
+                width,
+                coverage,
+            )
+            for glyph_set, partial_path in zip(glyph_sets, partials)
+        ]
+        for glyph_set, future in zip(glyph_sets, futures):
+            spans = future.result()
+            tracer.spans.extend(spans)
+            log(f"Built {glyph_set.source} in {spans[-1].duration:.1f}s")
+
+        # Later glyph sets used to overwrite earlier ones, while mergeFonts
+        # keeps the glyphs already present, so merge from the last set back.
+        log("Merge glyph sets")
+        with stage("mergeFonts"):
+            for partial_path in reversed(partials):
+                nerd.mergeFonts(str(partial_path))
+                count(calls=1)
+
     return nerd
 
 
+# modules the reshape runs, hashed into the name of its output
+RESHAPE_CODE = ["build_nerd.py", "utils.py"]
+
+
+def shaped_path(nerd_path: Path, shape_to: GlyphShape) -> Path:
+    """Path of the Nerd Font at `nerd_path` fitted to `shape_to`.
+
+    The name is `<stem>-<source>-<shape>.ttf`, <source> hashing the font and
+    the reshape code, and <shape> hashing `shape_to`. Variants of the same
+    shape share the file and any change builds a new one.
+    """
+    source = hash_config(
+        {
+            "font": hash_file(nerd_path),
+            "code": [hash_file(SRC_DIR / module) for module in RESHAPE_CODE],
+        }
+    )
+    shape = hash_config(asdict(shape_to))
+    return nerd_path.with_name(f"{nerd_path.stem}-{source[:12]}-{shape[:12]}.ttf")
+
+
+def prune_shaped(nerd_path: Path, keep: Path) -> None:
+    """Remove the fitted Nerd Fonts of an older font or reshape code than `keep`.
+
+    Files of other shapes of the same source are still in use and kept.
+    """
+    stem = re.escape(nerd_path.stem)
+    source = keep.name.split("-")[-2]
+    for path in nerd_path.parent.iterdir():
+        match = re.fullmatch(rf"{stem}-([0-9a-f]{{12}})-[0-9a-f]{{12}}\.ttf", path.name)
+        if match is not None and match[1] != source:
+            log(f"  remove {path.name}")
+            path.unlink(missing_ok=True)
+
+
+def reshape_nerd(nerd_path: Path, shape_to: GlyphShape, output_path: Path) -> None:
+    """Refit a built Nerd Font into cells of `shape_to`, one transform per glyph.
+
+    The glyph sets are already fitted to the ascent, descent and width the
+    font was built with, so each set is refitted by the ratio of the cells,
+    and re-centered with `fit_glyphs` like `modify` does.
+    """
+    nerd = fontforge.open(str(nerd_path))
+    width = shape_to.half_width
+
+    # later glyph sets take priority, as in build_nerd
+    owners = {
+        dst: i
+        for i, glyph_set in enumerate(GLYPH_SETS)
+        for dst in glyph_set.mapping().values()
+    }
+    groups: dict[int, list[Glyph]] = {}
+    for glyph in nerd.glyphs():
+        if glyph.unicode in owners:
+            groups.setdefault(owners[glyph.unicode], []).append(glyph)
+        else:
+            glyph.width = width
+
+    for i, glyphs in groups.items():
+        glyph_set = GLYPH_SETS[i]
+        if glyph_set.fit_target == "max_height":
+            scale = (shape_to.ascent + shape_to.descent) / nerd.em
+        else:
+            # all the glyphs of a set share the build width
+            scale = width / glyphs[0].width
+
+        # baseline sets already sit on the baseline, others on the ascent
+        shift_y = 0.0
+        if glyph_set.valign != "baseline":
+            shift_y = shape_to.ascent - nerd.ascent * scale
+
+        fit_glyphs(glyphs, BBoxIndex(glyphs), scale, shift_y, width, glyph_set.halign)
+        count(glyphs=len(glyphs))
+
+    nerd.ascent = shape_to.ascent
+    nerd.descent = shape_to.descent
+
+    # a unique temporary file, as concurrent builds may need the same shape;
+    # fontforge picks the format from the extension
+    with tempfile.NamedTemporaryFile(
+        dir=output_path.parent, suffix=".ttf", delete=False
+    ) as f:
+        tmp_path = Path(f.name)
+    try:
+        nerd.generate(str(tmp_path))
+        tmp_path.replace(output_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+        nerd.close()
+
+
+def build_shaped_nerd(nerd_path: Path, shape_to: GlyphShape) -> Path:
+    """Path of the Nerd Font fitted to `shape_to`, built unless it exists."""
+    output_path = shaped_path(nerd_path, shape_to)
+    if not output_path.exists():
+        log(f"Fit {nerd_path.name} to {shape_to} as {output_path.name}")
+        with stage("reshape Nerd Font"):
+            reshape_nerd(nerd_path, shape_to, output_path)
+        prune_shaped(nerd_path, output_path)
+
+    return output_path
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Nerd generator.",
@@ -332,6 +534,25 @@ def parse_args() -> argparse.Namespace:
         default=864,
         help="Descent.",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of glyph sets built at once. Defaults to the number of CPUs.",
+    )
+
+    parser.add_argument(
+        "--coverage",
+        type=str,
+        required=False,
+        help="Coverage json, the same as the coverage of parameter.json.",
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        required=False,
+        help="Write a Chrome trace of the build stages to this file.",
+    )
 
     return parser.parse_args()
 
@@ -343,8 +564,25 @@ if __name__ == "__main__":
     log(f"  ascent: {args.ascent}")
     log(f"  descent: {args.descent}")
     log(f"  width: {args.width}")
-    nerd = build_nerd(Path(args.src_dir), args.ascent, args.descent, args.width)
+    coverage = None
+    if args.coverage is not None:
+        with open(args.coverage) as f:
+            coverage = Coverage.from_dict(json.load(f))
+
+    nerd = build_nerd(
+        Path(args.src_dir),
+        args.ascent,
+        args.descent,
+        args.width,
+        args.jobs,
+        coverage,
+    )
 
     output_path = str(Path(args.dst_dir) / f"{nerd.fontname}.ttf")
     log(f"Generate {output_path}")
-    nerd.generate(output_path)
+    with stage("generate"):
+        nerd.generate(output_path)
+
+    if args.profile is not None:
+        tracer.print_summary()
+        tracer.save(Path(args.profile))
@@ -1,19 +1,58 @@
 import argparse
+import dataclasses
 import json
+import re
+import resource
 from pathlib import Path
+from typing import Callable
 
 import fontforge
 from fontforge import font as Font
 
-from .modify_bizud import modify_bizud
-from .modify_hack import modify_hack
-from .parameter import Parameter
-from .utils import append_sfnt_name, create_font, log, set_os2_table
+from .build_nerd import build_shaped_nerd
+from .modify_bizud import modify_bizud_upright
+from .modify_hack import modify_hack_upright
+from .parameter import Coverage, Parameter
+from .stage_cache import StageCache, run_stage
+from .tracing import count, stage, tracer
+from .utils import (
+    append_sfnt_name,
+    create_font,
+    glyph_unicodes,
+    italicize,
+    log,
+    remove_uncovered,
+    set_os2_table,
+)
 
 # Language IDs
 US = 0x0409  # en-US English (US)
 JP = 0x0411  # ja-JP Japanese
 
+# glyphs the modifications draw on or copy from, kept in sample builds
+MODIFIED_CODEPOINTS = [0x30, 0x6D, 0x7C, 0xA6, 0xB7, 0x25A1, 0x25C6, 0x3000]
+
+
+def read_codepoints(path: Path) -> list[int]:
+    """Codepoints in a text file, each word a U+XXXX or 0xXXXX or the characters."""
+    codepoints = []
+    for word in path.read_text().split():
+        if re.fullmatch(r"(U\+|0x)[0-9A-Fa-f]+", word):
+            codepoints.append(int(word[2:], 16))
+        else:
+            codepoints.extend(ord(char) for char in word)
+
+    return codepoints
+
+
+def sample_parameter(parameter: Parameter, codepoints: list[int]) -> Parameter:
+    """`parameter` narrowed to `codepoints`, within its own coverage if any."""
+    sample = {ord(" "), *codepoints, *MODIFIED_CODEPOINTS}
+    if parameter.coverage is not None:
+        sample = {unicode for unicode in sample if parameter.coverage.covers(unicode)}
+
+    return dataclasses.replace(parameter, coverage=Coverage.from_codepoints(sample))
+
 
 def build_pennywort(
     parameter: Parameter,
@@ -21,40 +60,102 @@ def build_pennywort(
     version: str,
     copyright_file: str | None,
     license_url: str | None,
+    cache: StageCache | None = None,
+    weight_shards: int = 1,
+    low_memory: bool = False,
+    opener: Callable[[Path], Font] | None = None,
 ) -> Font:
-    def open_font(file_name: str) -> Font:
-        return fontforge.open(str(source_fonts_dir / file_name))
-
-    log("Modify Hack")
-    hack = open_font(parameter.hack.source)
-    modify_hack(
-        hack,
-        parameter.hack.shape_as,
-        parameter.shape_to,
-        parameter.skew,
-        parameter.hack.m_cutoff,
-        parameter.hack.dot_zero,
-        parameter.hack.broken_vline,
-    )
-
-    log("Modify BIZUD")
-    bizud = open_font(parameter.bizud.source)
-    modify_bizud(
-        bizud,
-        parameter.bizud.shape_as,
-        parameter.shape_to,
-        parameter.skew,
-        parameter.bizud.visualize_zenkaku_space,
-        parameter.bizud.baseline_shift,
-        parameter.bizud.weight,
-    )
-
-    log("Modify Nerd Font")
-    nerd = open_font(parameter.nerd.source)
-    for glyph in nerd.glyphs():
-        glyph.width = parameter.shape_to.half_width
-
-    log("Merge fonts")
+    """Modify and merge the source fonts.
+
+    With `low_memory`, each source is modified, merged and closed before the
+    next one is opened, instead of keeping the three of them open. `opener`
+    replaces `fontforge.open` for the source fonts, e.g. to hand out fonts
+    that are already loaded; it must return a font the build may modify.
+    """
+
+    def open_font(path: Path) -> Font:
+        with stage(f"open {path.name}"):
+            font = fontforge.open(str(path)) if opener is None else opener(path)
+
+        if parameter.coverage is not None:
+            with stage(f"coverage {path.name}"):
+                n = remove_uncovered(font, parameter.coverage.covers)
+                count(glyphs=n)
+            log(f"  coverage removed {n} glyphs from {path.name}")
+
+        return font
+
+    def build_hack() -> Font:
+        hack = open_font(source_fonts_dir / parameter.hack.source)
+        modify_hack_upright(
+            hack,
+            parameter.hack.shape_as,
+            parameter.shape_to,
+            parameter.hack.m_cutoff,
+            parameter.hack.dot_zero,
+            parameter.hack.broken_vline,
+        )
+        return hack
+
+    def modify_hack() -> Font:
+        log("Modify Hack")
+        with stage("Hack"):
+            hack = run_stage(
+                cache,
+                "hack",
+                [source_fonts_dir / parameter.hack.source],
+                [parameter.hack, parameter.shape_to, parameter.coverage],
+                ["modify_hack.py", "utils.py"],
+                build_hack,
+            )
+            if parameter.skew:
+                with stage("italicize Hack"):
+                    n = italicize(hack, parameter.skew)
+                    count(glyphs=n)
+
+        return hack
+
+    def build_bizud() -> Font:
+        bizud = open_font(source_fonts_dir / parameter.bizud.source)
+        modify_bizud_upright(
+            bizud,
+            parameter.bizud.shape_as,
+            parameter.shape_to,
+            parameter.bizud.visualize_zenkaku_space,
+            parameter.bizud.baseline_shift,
+            parameter.bizud.weight,
+            weight_shards,
+        )
+        return bizud
+
+    def modify_bizud() -> Font:
+        log("Modify BIZUD")
+        with stage("BIZUD"):
+            bizud = run_stage(
+                cache,
+                "bizud",
+                [source_fonts_dir / parameter.bizud.source],
+                [parameter.bizud, parameter.shape_to, parameter.coverage],
+                ["modify_bizud.py", "utils.py"],
+                build_bizud,
+            )
+            if parameter.skew:
+                with stage("italicize BIZUD"):
+                    n = italicize(bizud, parameter.skew)
+                    count(glyphs=n)
+
+        return bizud
+
+    def modify_nerd() -> Font:
+        log("Modify Nerd Font")
+        with stage("Nerd Font"):
+            nerd_path = build_shaped_nerd(
+                source_fonts_dir / parameter.nerd.source, parameter.shape_to
+            )
+            nerd = open_font(nerd_path)
+
+        return nerd
+
     family_name = parameter.family_name
     style_name = parameter.style_name
     pennywort = create_font(
@@ -69,13 +170,41 @@ def build_pennywort(
         version=version,
     )
 
-    pennywort.mergeFonts(nerd)  # Merge NerdFont first to prioritize its powerline glyph
-    pennywort.mergeFonts(hack)
-    pennywort.mergeFonts(bizud)
+    # NerdFont first to prioritize its powerline glyph
+    if low_memory:
+        merged: set[int] = set()
+        for name, modify in [
+            ("Nerd Font", modify_nerd),
+            ("Hack", modify_hack),
+            ("BIZUD", modify_bizud),
+        ]:
+            with stage(f"{name} merged") as span:
+                font = modify()
+                log(f"Merge {name}")
+                with stage(f"mergeFonts {name}"):
+                    # mergeFonts keeps existing glyphs, drop them beforehand so
+                    # that the priority does not depend on it
+                    n = remove_uncovered(font, lambda unicode: unicode not in merged)
+                    for glyph in font.glyphs():
+                        merged.update(glyph_unicodes(glyph))
+                    pennywort.mergeFonts(font)
+                    count(glyphs=n, calls=1)
+                font.close()
+            log(f"  {span.rss_summary()}")
+    else:
+        hack = modify_hack()
+        bizud = modify_bizud()
+        nerd = modify_nerd()
+
+        log("Merge fonts")
+        with stage("mergeFonts"):
+            for font in [nerd, hack, bizud]:
+                pennywort.mergeFonts(font)
+                count(calls=1)
 
-    hack.close()
-    bizud.close()
-    nerd.close()
+        hack.close()
+        bizud.close()
+        nerd.close()
 
     log("Set properties")
 
@@ -139,9 +268,68 @@ def parse_args() -> argparse.Namespace:
         required=False,
         help="License URL.",
     )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default="./tmp/cache",
+        help="Where the intermediate fonts are cached.",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=4096,
+        help="Cache size limit in MiB.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Rebuild every stage from the source fonts.",
+    )
+    parser.add_argument(
+        "--weight-shards",
+        type=int,
+        default=1,
+        help="Number of processes applying changeWeight to BIZUD.",
+    )
+    parser.add_argument(
+        "--engine",
+        type=str,
+        choices=["fontforge", "fonttools", "numpy"],
+        default="fontforge",
+        help="Geometry backend. fonttools still uses fontforge for changeWeight, "
+        + "numpy is fonttools with vectorized reshape and italic passes.",
+    )
+    parser.add_argument(
+        "--low-memory",
+        action="store_true",
+        help="Merge and close each source font before opening the next one. "
+        + "Only for the fontforge engine.",
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        required=False,
+        help="Write a Chrome trace of the build stages to this file.",
+    )
+    parser.add_argument(
+        "--sample",
+        action="store_true",
+        help="Only build the preview sample characters, "
+        + "and write <font>-sample.ttf with its preview html.",
+    )
+    parser.add_argument(
+        "--sample-file",
+        type=str,
+        required=False,
+        help="Sample these codepoints instead, as U+XXXX, 0xXXXX or characters.",
+    )
     parser.add_argument("parameter_file", type=str, help="Path to parameter.json.")
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.low_memory and args.engine != "fontforge":
+        parser.error("--low-memory is only for the fontforge engine")
+
+    return args
 
 
 if __name__ == "__main__":
@@ -151,15 +339,73 @@ if __name__ == "__main__":
     with open(args.parameter_file) as f:
         parameter = Parameter.from_dict(json.load(f))
 
+    suffix = ""
+    sample = args.sample or args.sample_file is not None
+    if sample:
+        # fontTools is only needed by the preview
+        from .export_html import sample_codepoints
+
+        codepoints = sample_codepoints()
+        if args.sample_file is not None:
+            codepoints = read_codepoints(Path(args.sample_file))
+        parameter = sample_parameter(parameter, codepoints)
+        suffix = "-sample"
+
+    cache = None
+    if not args.no_cache:
+        cache = StageCache(Path(args.cache_dir), args.cache_size * 1024 * 1024)
+
     log(f"Build {parameter.family_name} {parameter.style_name} {args.version}")
-    pennywort = build_pennywort(
-        parameter,
-        source_fonts_dir,
-        args.version,
-        args.copyright_file,
-        args.license_url,
-    )
+    if args.engine in ["fonttools", "numpy"]:
+        # fontTools is only needed by these engines
+        from .engine_fonttools import build_pennywort_fonttools
+
+        pennywort_tt = build_pennywort_fonttools(
+            parameter,
+            source_fonts_dir,
+            args.version,
+            args.copyright_file,
+            args.license_url,
+            args.weight_shards,
+            vectorized=args.engine == "numpy",
+        )
+
+        fontname = f"{parameter.family_name}-{parameter.style_name}".replace(" ", "")
+        output_path = str(Path(args.dst_dir) / f"{fontname}{suffix}.ttf")
+        log(f"Generate {output_path}")
+        with stage("generate"):
+            pennywort_tt.save(output_path)
+        glyph_count = len(pennywort_tt.getGlyphOrder())
+    else:
+        pennywort = build_pennywort(
+            parameter,
+            source_fonts_dir,
+            args.version,
+            args.copyright_file,
+            args.license_url,
+            cache,
+            args.weight_shards,
+            args.low_memory,
+        )
+
+        output_path = str(Path(args.dst_dir) / f"{pennywort.fontname}{suffix}.ttf")
+        log(f"Generate {output_path}")
+        with stage("generate"):
+            pennywort.generate(output_path)
+        glyph_count = sum(1 for glyph in pennywort.glyphs() if glyph.isWorthOutputting)
+
+    size = Path(output_path).stat().st_size / 2**20
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    log(f"  {glyph_count} glyphs, {size:.1f} MiB, peak RSS {peak_rss:.0f} MiB")
+
+    if sample:
+        from .export_html import export_html
+
+        html_path = Path(output_path).with_suffix(".html")
+        log(f"Preview {html_path}")
+        with stage("preview"):
+            export_html(Path(output_path), html_path)
 
-    output_path = str(Path(args.dst_dir) / f"{pennywort.fontname}.ttf")
-    log(f"Generate {output_path}")
-    pennywort.generate(output_path)
+    if args.profile is not None:
+        tracer.print_summary()
+        tracer.save(Path(args.profile))
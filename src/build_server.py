@@ -0,0 +1,414 @@
+import argparse
+import json
+import multiprocessing
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.connection import Connection, wait
+from multiprocessing.context import ForkProcess
+from pathlib import Path
+
+import fontforge
+from fontforge import font as Font
+
+from .build_nerd import build_shaped_nerd
+from .build_pennywort import build_pennywort
+from .manifest import SRC_DIR, hash_file
+from .parameter import Parameter
+from .stage_cache import StageCache, hash_config
+from .utils import log
+
+# outputs named by BuildService, the only files it removes from its directory
+OUTPUT_NAME = re.compile(r"[0-9a-f]{32}(\.tmp)?\.ttf")
+
+# source fonts parsed once by the server, inherited by the forked builders
+_sources: dict[Path, Font] = {}
+
+
+def preload(paths: list[Path]) -> dict[Path, str]:
+    """Load `paths` for the builders, returning their hashes as loaded."""
+    hashes = {}
+    for path in paths:
+        start = time.perf_counter()
+        # hashed first, a file replaced while loading is a different source
+        hashes[path.resolve()] = hash_file(path)
+        _sources[path.resolve()] = fontforge.open(str(path))
+        log(f"  loaded {path.name} in {time.perf_counter() - start:.1f}s")
+
+    return hashes
+
+
+def hash_code() -> dict[Path, str]:
+    """Hashes of the build code, as imported by the server."""
+    return {path.resolve(): hash_file(path) for path in SRC_DIR.glob("*.py")}
+
+
+def open_preloaded(path: Path) -> Font:
+    # the builder runs in a forked child, modifying its own copy is fine
+    font = _sources.get(path.resolve())
+    return fontforge.open(str(path)) if font is None else font
+
+
+@dataclass(frozen=True)
+class BuildOptions:
+    source_fonts_dir: Path
+    version: str
+    copyright_file: str | None
+    license_url: str | None
+    cache_dir: Path | None
+    cache_size: int  # bytes
+    # sources and code as loaded by the server, not as they are now on disk
+    file_hashes: dict[Path, str] = field(default_factory=dict)
+
+
+def build_font(parameter: Parameter, options: BuildOptions, output_path: Path) -> None:
+    """Build `parameter` into `output_path`, in a forked child of the builder."""
+    cache = None
+    if options.cache_dir is not None:
+        cache = StageCache(options.cache_dir, options.cache_size, options.file_hashes)
+
+    pennywort = build_pennywort(
+        parameter,
+        options.source_fonts_dir,
+        options.version,
+        options.copyright_file,
+        options.license_url,
+        cache,
+        opener=open_preloaded,
+    )
+    # fontforge picks the format from the extension
+    tmp_path = output_path.with_suffix(".tmp.ttf")
+    pennywort.generate(str(tmp_path))
+    tmp_path.replace(output_path)
+
+
+def run_builder(
+    conn: Connection, server_conn: Connection, options: BuildOptions
+) -> None:
+    """Fork a child running `build_font` for each `(key, parameter, output_path)`
+    received on `conn`, and send back `(key, exitcode)` as each one exits.
+
+    Runs single-threaded in its own process, so the children are never forked
+    while another thread holds a lock. Stops after the running builds once
+    `None` is received or the server is gone.
+    """
+    # inherited through the fork, the server end would keep `conn` from closing
+    server_conn.close()
+    context = multiprocessing.get_context("fork")
+    running: dict[int, tuple[str, ForkProcess]] = {}
+    accepting = True
+
+    while accepting or running:
+        for ready in wait([conn, *running] if accepting else list(running)):
+            if ready is conn:
+                try:
+                    request = conn.recv()
+                except EOFError:
+                    request = None
+                if request is None:
+                    accepting = False
+                    continue
+
+                key, parameter, output_path = request
+                process = context.Process(
+                    target=build_font, args=(parameter, options, output_path)
+                )
+                process.start()
+                running[process.sentinel] = (key, process)
+            else:
+                assert isinstance(ready, int)
+                key, process = running.pop(ready)
+                process.join()
+                try:
+                    conn.send((key, process.exitcode))
+                except OSError:
+                    accepting = False
+
+
+class BuildService:
+    """Builds fonts through a builder process and keeps the most recent outputs.
+
+    The builder is forked before any server thread starts and forks a child for
+    each build. At most `jobs` builds run at once and further requests wait for
+    a slot. Outputs are keyed by the parameter hash; concurrent requests for the
+    same parameter wait for a single build.
+    """
+
+    def __init__(
+        self,
+        options: BuildOptions,
+        output_dir: Path,
+        jobs: int = 1,
+        max_entries: int = 16,
+    ) -> None:
+        self.options = options
+        self.output_dir = output_dir
+        self.max_entries = max_entries
+        self.outputs: OrderedDict[str, Path] = OrderedDict()
+        self._slots = threading.BoundedSemaphore(jobs)
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+        self._pending: dict[str, Future[int]] = {}
+        self._closed = False
+
+        # outputs of a previous server are not tracked by this one
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        for old_output in self.output_dir.iterdir():
+            if OUTPUT_NAME.fullmatch(old_output.name):
+                old_output.unlink()
+
+        self._conn, builder_conn = multiprocessing.Pipe()
+        self._builder = multiprocessing.get_context("fork").Process(
+            target=run_builder, args=(builder_conn, self._conn, options)
+        )
+        self._builder.start()
+        builder_conn.close()
+        self._reader = threading.Thread(target=self._read_results, daemon=True)
+        self._reader.start()
+
+    def _read_results(self) -> None:
+        while True:
+            try:
+                key, exitcode = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                future = self._pending.pop(key)
+            future.set_result(exitcode)
+
+        with self._lock:
+            self._closed = True
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(RuntimeError("Builder exited"))
+
+    def _submit(self, key: str, parameter: Parameter, output_path: Path) -> int:
+        future: Future[int] = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Builder exited")
+            self._pending[key] = future
+            self._conn.send((key, parameter, output_path))
+        return future.result()
+
+    def close(self) -> None:
+        """Stop the builder after the running builds."""
+        with self._lock:
+            if not self._closed:
+                self._conn.send(None)
+        self._builder.join()
+        self._reader.join()
+        self._conn.close()
+
+    def lookup(self, key: str) -> bytes | None:
+        with self._lock:
+            if key not in self.outputs:
+                return None
+            self.outputs.move_to_end(key)
+            return self.outputs[key].read_bytes()
+
+    def insert(self, key: str, path: Path) -> bytes:
+        with self._lock:
+            self.outputs[key] = path
+            while len(self.outputs) > self.max_entries:
+                _, old_path = self.outputs.popitem(last=False)
+                old_path.unlink(missing_ok=True)
+            return path.read_bytes()
+
+    def build(self, parameter: Parameter) -> tuple[bytes, bool]:
+        """The built font, and whether it came from the cache."""
+        key = hash_config(parameter)[:32]
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            data = self.lookup(key)
+            if data is not None:
+                return data, True
+
+            output_path = self.output_dir / f"{key}.ttf"
+            with self._slots:
+                log(f"Build {parameter.family_name} {parameter.style_name} {key}")
+                start = time.perf_counter()
+                exitcode = self._submit(key, parameter, output_path)
+                if exitcode != 0:
+                    raise RuntimeError(f"Build exited with {exitcode}")
+                log(f"  built {key} in {time.perf_counter() - start:.1f}s")
+
+            return self.insert(key, output_path), False
+
+
+class BuildHandler(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        if self.path != "/build":
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        assert isinstance(self.server, BuildHTTPServer)
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            parameter = Parameter.from_dict(json.loads(self.rfile.read(length)))
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_error(HTTPStatus.BAD_REQUEST, f"Invalid parameter: {e}")
+            return
+
+        try:
+            data, hit = self.server.service.build(parameter)
+        except RuntimeError as e:
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "font/ttf")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("X-Cache", "hit" if hit else "miss")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: object) -> None:
+        log(f"{self.address_string()} {format % args}")
+
+
+class BuildHTTPServer(ThreadingHTTPServer):
+    def __init__(self, address: tuple[str, int], service: BuildService) -> None:
+        super().__init__(address, BuildHandler)
+        self.service = service
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Build server keeping the source fonts loaded.",
+        usage="python -m src.build_server --src-dir ./tmp --port 8000"
+        + " ./parameters/*.json\n"
+        + "curl --data-binary @./parameters/Pennywort-Regular.json"
+        + " -o Pennywort-Regular.ttf http://localhost:8000/build",
+    )
+    parser.add_argument(
+        "--src-dir",
+        type=str,
+        required=True,
+        help="Where the source fonts.",
+    )
+    parser.add_argument(
+        "--host",
+        type=str,
+        default="127.0.0.1",
+        help="Address to listen on.",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8000,
+        help="Port to listen on.",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        default="./tmp/server",
+        help="Where the built fonts are kept.",
+    )
+    parser.add_argument(
+        "--max-entries",
+        type=int,
+        default=16,
+        help="Number of built fonts kept, least recently requested evicted first.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of fonts built at once, further requests are queued.",
+    )
+    parser.add_argument(
+        "--version",
+        type=str,
+        default="1.000",
+        help="Font version.",
+    )
+    parser.add_argument(
+        "--copyright-file",
+        type=str,
+        required=False,
+        help="Copyright file.",
+    )
+    parser.add_argument(
+        "--license-url",
+        type=str,
+        required=False,
+        help="License URL.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default="./tmp/cache",
+        help="Where the intermediate fonts are cached.",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=4096,
+        help="Cache size limit in MiB.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Rebuild every stage from the source fonts.",
+    )
+    parser.add_argument(
+        "parameter_files",
+        type=str,
+        nargs="*",
+        help="Preload the sources of these parameter.json, "
+        + "or every font in --src-dir if none.",
+    )
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    source_fonts_dir = Path(args.src_dir)
+    sources: set[Path] = set()
+    for parameter_file in args.parameter_files:
+        with open(parameter_file) as f:
+            parameter = Parameter.from_dict(json.load(f))
+        sources.update(
+            [
+                source_fonts_dir / parameter.hack.source,
+                source_fonts_dir / parameter.bizud.source,
+                build_shaped_nerd(
+                    source_fonts_dir / parameter.nerd.source, parameter.shape_to
+                ),
+            ]
+        )
+
+    log("Load source fonts")
+    if sources:
+        file_hashes = preload(sorted(sources))
+    else:
+        file_hashes = preload(sorted(source_fonts_dir.glob("*.ttf")))
+    file_hashes.update(hash_code())
+
+    options = BuildOptions(
+        source_fonts_dir,
+        args.version,
+        args.copyright_file,
+        args.license_url,
+        None if args.no_cache else Path(args.cache_dir),
+        args.cache_size * 1024 * 1024,
+        file_hashes,
+    )
+    service = BuildService(options, Path(args.output_dir), args.jobs, args.max_entries)
+    server = BuildHTTPServer((args.host, args.port), service)
+    log(f"Listening on http://{args.host}:{args.port}/build")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,215 @@
+import argparse
+import json
+import re
+from pathlib import Path
+from statistics import median
+from typing import Callable
+
+import fontforge
+from fontforge import font as Font
+from fontforge import glyph as Glyph
+
+from . import modify_bizud, modify_hack
+from .modify_bizud import embolden_glyph
+from .parameter import Parameter
+from .stem_weight import glyph_edges, measure_glyph
+from .utils import Outline, dump_outline, load_outline, log
+
+# representative glyphs, mostly straight vertical strokes and closed boxes
+KANA_SAMPLE = "いくこしつてとのへりるんイエカコテトノロ"
+KANJI_SAMPLE = "一二三十口日月田目中国本出人大山川工上下"
+
+# search ranges and resolution, in font units
+WEIGHT_RANGE = (-20.0, 60.0)
+BASELINE_RANGE = (-200.0, 300.0)
+TOLERANCE = 0.5
+
+Sample = dict[str, tuple[int, Outline]]  # glyph name to (width, outline)
+
+
+def bisect(
+    measure: Callable[[float], float],
+    target: float,
+    low: float,
+    high: float,
+    tolerance: float = TOLERANCE,
+) -> float:
+    """Value in [low, high] where the increasing `measure` meets `target`."""
+    if measure(low) >= target:
+        return low
+    if measure(high) <= target:
+        return high
+
+    while high - low > tolerance:
+        middle = (low + high) / 2
+        if measure(middle) < target:
+            low = middle
+        else:
+            high = middle
+
+    return (low + high) / 2
+
+
+def hack_targets(parameter: Parameter, source_fonts_dir: Path) -> tuple[float, float]:
+    """Stem width of 'l' and center of 'x' in Hack, fitted to `shape_to`."""
+    hack = fontforge.open(str(source_fonts_dir / parameter.hack.source))
+    hack.ascent = parameter.hack.shape_as.ascent
+    hack.descent = parameter.hack.shape_as.descent
+
+    l_glyph, x_glyph = hack[ord("l")], hack[ord("x")]
+    for glyph in [l_glyph, x_glyph]:
+        modify_hack.fit_glyph(glyph, parameter.hack.shape_as, parameter.shape_to)
+
+    stems = measure_glyph(glyph_edges(l_glyph), ord("l"))
+    assert stems is not None
+    _, bottom, _, top = x_glyph.boundingBox()
+    hack.close()
+
+    return stems.vertical, (bottom + top) / 2
+
+
+def load_sample(bizud: Font, text: str) -> Sample:
+    """Outlines of the glyphs in `text`, skipping those with references."""
+    sample = {}
+    for char in text:
+        if ord(char) in bizud and not bizud[ord(char)].references:
+            glyph = bizud[ord(char)]
+            sample[glyph.glyphname] = (glyph.width, dump_outline(glyph))
+
+    return sample
+
+
+def trial(
+    bizud: Font,
+    original_em: int,
+    parameter: Parameter,
+    sample: Sample,
+    baseline_shift: float,
+    weight: float,
+) -> list[Glyph]:
+    """Sample glyphs fitted and emboldened as `modify_bizud_upright` would."""
+    glyphs = []
+    for name, (width, outline) in sample.items():
+        glyph = bizud[name]
+        load_outline(glyph, outline)
+        glyph.width = width
+
+        target_width = modify_bizud.fit_glyph(
+            glyph,
+            original_em,
+            parameter.bizud.shape_as,
+            parameter.shape_to,
+            baseline_shift,
+        )
+        if target_width is not None and weight != 0:
+            embolden_glyph(glyph, weight, target_width)
+        glyphs.append(glyph)
+
+    return glyphs
+
+
+def calibrate(
+    parameter: Parameter,
+    source_fonts_dir: Path,
+    targets: list[str],
+) -> dict[str, float]:
+    """BIZUD `baseline_shift` and `weight` matching Hack, for each of `targets`.
+
+    "center" puts the median center of the kanji sample at the center of the
+    Hack x-height, "stem" makes the median vertical stem of the kana sample as
+    wide as the stem of Hack 'l'. The baseline is calibrated first, as
+    changeWeight barely moves the center.
+    """
+    stem_target, center_target = hack_targets(parameter, source_fonts_dir)
+
+    bizud = fontforge.open(str(source_fonts_dir / parameter.bizud.source))
+    original_em = bizud.em
+    bizud.ascent = parameter.bizud.shape_as.ascent
+    bizud.descent = parameter.bizud.shape_as.descent
+
+    values: dict[str, float] = {}
+
+    if "center" in targets:
+        kanji = load_sample(bizud, KANJI_SAMPLE)
+
+        def measure_center(baseline_shift: float) -> float:
+            glyphs = trial(bizud, original_em, parameter, kanji, baseline_shift, 0)
+            return median(
+                (box[1] + box[3]) / 2 for box in (g.boundingBox() for g in glyphs)
+            )
+
+        shift = round(bisect(measure_center, center_target, *BASELINE_RANGE))
+        values["baseline_shift"] = shift
+        log(f"  x-height center {center_target:.1f}: baseline_shift {shift}")
+
+    if "stem" in targets:
+        kana = load_sample(bizud, KANA_SAMPLE)
+        baseline_shift = values.get("baseline_shift", parameter.bizud.baseline_shift)
+
+        def measure_stem(weight: float) -> float:
+            glyphs = trial(bizud, original_em, parameter, kana, baseline_shift, weight)
+            stems = [measure_glyph(glyph_edges(glyph), 0) for glyph in glyphs]
+            return median(s.vertical for s in stems if s is not None)
+
+        weight = round(bisect(measure_stem, stem_target, *WEIGHT_RANGE))
+        values["weight"] = weight
+        log(f"  'l' stem {stem_target:.1f}: weight {weight}")
+
+    bizud.close()
+    return values
+
+
+def write_values(parameter_file: Path, values: dict[str, float]) -> None:
+    """Replace the values of `values` keys in place, keeping the formatting."""
+    text = parameter_file.read_text()
+    for key, value in values.items():
+        text, n = re.subn(rf'("{key}":\s*)-?[\d.]+', rf"\g<1>{value}", text)
+        if n != 1:
+            raise ValueError(f'"{key}" appears {n} times in {parameter_file}')
+
+    parameter_file.write_text(text)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Calibrate BIZUD baseline_shift and weight against Hack.",
+        usage="python -m src.calibrate --src-dir ./tmp"
+        + " ./parameters/Pennywort-Regular.json",
+    )
+    parser.add_argument(
+        "--src-dir",
+        type=str,
+        required=True,
+        help="Where the source fonts.",
+    )
+    parser.add_argument(
+        "--target",
+        type=str,
+        nargs="+",
+        choices=["center", "stem"],
+        default=["center", "stem"],
+        help="center: kanji center on the Hack x-height center, "
+        + "stem: kana stems as wide as Hack 'l'.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print the values without writing the parameter file.",
+    )
+    parser.add_argument("parameter_file", type=str, help="Path to parameter.json.")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    parameter_file = Path(args.parameter_file)
+    with open(parameter_file) as f:
+        parameter = Parameter.from_dict(json.load(f))
+
+    log(f"Calibrate {parameter.family_name} {parameter.style_name}")
+    values = calibrate(parameter, Path(args.src_dir), args.target)
+    if not args.dry_run:
+        write_values(parameter_file, values)
+        log(f"Wrote {parameter_file}")
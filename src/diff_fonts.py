@@ -0,0 +1,248 @@
+import argparse
+import hashlib
+import html
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from fontTools.pens.boundsPen import BoundsPen
+from fontTools.pens.recordingPen import DecomposingRecordingPen
+from fontTools.pens.svgPathPen import SVGPathPen
+from fontTools.ttLib import TTFont
+
+from .font_info import read_font_info
+
+# codepoints hashed per task
+CHUNK_SIZE = 2048
+
+GlyphKey = tuple[str, int, tuple[int, ...]]  # (outline hash, width, bbox)
+
+
+@dataclass(frozen=True)
+class GlyphChange:
+    codepoint: int
+    old: GlyphKey
+    new: GlyphKey
+
+    @property
+    def outline_changed(self) -> bool:
+        return self.old[0] != self.new[0]
+
+    @property
+    def width_delta(self) -> int:
+        return self.new[1] - self.old[1]
+
+    @property
+    def bbox_delta(self) -> tuple[int, ...]:
+        return tuple(new - old for old, new in zip(self.old[2], self.new[2]))
+
+
+@dataclass(frozen=True)
+class FontDiff:
+    added: list[int]
+    removed: list[int]
+    changed: list[GlyphChange]
+
+
+def hash_glyphs(font_path: Path, codepoints: list[int]) -> dict[int, GlyphKey]:
+    """Outline hash, advance width and bounding box of each codepoint.
+
+    Outlines are decomposed and rounded to integers, so composite and simple
+    glyphs that draw the same shape hash the same.
+    """
+    font = TTFont(str(font_path), lazy=True)
+    cmap = font.getBestCmap()
+    glyph_set = font.getGlyphSet()
+
+    keys = {}
+    for codepoint in codepoints:
+        name = cmap[codepoint]
+        pen = DecomposingRecordingPen(glyph_set)
+        glyph_set[name].draw(pen)
+        # qCurveTo ends with None for contours of off-curve points only
+        outline = [
+            (operator, [pt and (round(pt[0]), round(pt[1])) for pt in operands])
+            for operator, operands in pen.value
+        ]
+
+        bounds_pen = BoundsPen(glyph_set)
+        glyph_set[name].draw(bounds_pen)
+        bbox = tuple(round(v) for v in bounds_pen.bounds or (0, 0, 0, 0))
+
+        digest = hashlib.sha256(repr(outline).encode()).hexdigest()
+        keys[codepoint] = (digest, glyph_set[name].width, bbox)
+
+    font.close()
+    return keys
+
+
+def hash_font(
+    executor: ProcessPoolExecutor,
+    font_path: Path,
+    codepoints: list[int],
+) -> dict[int, GlyphKey]:
+    chunks = [
+        codepoints[i : i + CHUNK_SIZE] for i in range(0, len(codepoints), CHUNK_SIZE)
+    ]
+    keys: dict[int, GlyphKey] = {}
+    for chunk_keys in executor.map(hash_glyphs, [font_path] * len(chunks), chunks):
+        keys.update(chunk_keys)
+
+    return keys
+
+
+def diff_fonts(old_path: Path, new_path: Path, jobs: int | None = None) -> FontDiff:
+    old_codepoints = set(read_font_info(old_path).codepoints)
+    new_codepoints = set(read_font_info(new_path).codepoints)
+    common = sorted(old_codepoints & new_codepoints)
+
+    with ProcessPoolExecutor(jobs) as executor:
+        old_keys = hash_font(executor, old_path, common)
+        new_keys = hash_font(executor, new_path, common)
+
+    return FontDiff(
+        added=sorted(new_codepoints - old_codepoints),
+        removed=sorted(old_codepoints - new_codepoints),
+        changed=[
+            GlyphChange(codepoint, old_keys[codepoint], new_keys[codepoint])
+            for codepoint in common
+            if old_keys[codepoint] != new_keys[codepoint]
+        ],
+    )
+
+
+def format_ranges(codepoints: list[int]) -> str:
+    ranges: list[list[int]] = []
+    for codepoint in codepoints:
+        if ranges and ranges[-1][1] + 1 == codepoint:
+            ranges[-1][1] = codepoint
+        else:
+            ranges.append([codepoint, codepoint])
+
+    return ", ".join(
+        hex(start) if start == stop else f"{hex(start)}~{hex(stop)}"
+        for start, stop in ranges
+    )
+
+
+def print_report(diff: FontDiff, verbose: bool = False) -> None:
+    print(f"added: {len(diff.added)}")
+    if diff.added:
+        print(f"  {format_ranges(diff.added)}")
+    print(f"removed: {len(diff.removed)}")
+    if diff.removed:
+        print(f"  {format_ranges(diff.removed)}")
+
+    outline_changes = sum(change.outline_changed for change in diff.changed)
+    print(f"changed: {len(diff.changed)} ({outline_changes} outlines)")
+    for change in diff.changed if verbose else diff.changed[:20]:
+        print(
+            f"  {hex(change.codepoint)} {chr(change.codepoint)!r}: "
+            + f"width {change.width_delta:+}, bbox {change.bbox_delta}"
+            + (", outline" if change.outline_changed else "")
+        )
+    if not verbose and len(diff.changed) > 20:
+        print(f"  ... {len(diff.changed) - 20} more, use --verbose")
+
+
+def glyph_svg(
+    font: TTFont,
+    glyph_set: Any,
+    cmap: dict[int, str],
+    codepoint: int,
+    size: int,
+) -> str:
+    """`codepoint` drawn in a `size` px square, `glyph_set` and `cmap` of `font`."""
+    name = cmap[codepoint]
+    pen = SVGPathPen(glyph_set)
+    glyph_set[name].draw(pen)
+
+    em = font["head"].unitsPerEm
+    ascent = font["hhea"].ascent
+    width = glyph_set[name].width
+    return (
+        f"<svg width='{size}' height='{size}' viewBox='0 0 {em} {em}'>"
+        + f"<rect width='{width}' height='{em}' fill='none' stroke='blue'/>"
+        + f"<path transform='matrix(1 0 0 -1 0 {ascent})' d='{pen.getCommands()}'/>"
+        + "</svg>"
+    )
+
+
+def write_html(
+    diff: FontDiff,
+    old_path: Path,
+    new_path: Path,
+    output_path: Path,
+    size: int = 96,
+) -> None:
+    """Changed glyphs drawn side by side, old on the left."""
+    old_font = TTFont(str(old_path), lazy=True)
+    new_font = TTFont(str(new_path), lazy=True)
+    old_glyphs, old_cmap = old_font.getGlyphSet(), old_font.getBestCmap()
+    new_glyphs, new_cmap = new_font.getGlyphSet(), new_font.getBestCmap()
+
+    with open(output_path, "w") as f:
+        f.write("<!DOCTYPE html>\n<html lang='en'>\n<head>\n")
+        f.write("  <meta charset='UTF-8' />\n")
+        f.write("  <style>td { padding: 4px 12px; } svg { border: 1px solid gray; }")
+        f.write("</style>\n</head>\n<body>\n")
+        f.write(f"  <h1>{html.escape(old_path.name)} → {html.escape(new_path.name)}")
+        f.write("</h1>\n  <table>\n")
+        f.write("    <tr><th>codepoint</th><th>old</th><th>new</th>")
+        f.write("<th>delta</th></tr>\n")
+        for change in diff.changed:
+            old_svg = glyph_svg(old_font, old_glyphs, old_cmap, change.codepoint, size)
+            new_svg = glyph_svg(new_font, new_glyphs, new_cmap, change.codepoint, size)
+            f.write(
+                f"    <tr><td>{hex(change.codepoint)}</td>"
+                + f"<td>{old_svg}</td>"
+                + f"<td>{new_svg}</td>"
+                + f"<td>width {change.width_delta:+}<br>"
+                + f"bbox {change.bbox_delta}</td></tr>\n"
+            )
+        f.write("  </table>\n</body>\n</html>\n")
+
+    old_font.close()
+    new_font.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Glyph-level diff of two font builds.",
+        usage="python -m src.diff_fonts old/Pennywort-Regular.ttf"
+        + " dist/Pennywort-Regular.ttf --html diff.html",
+    )
+    parser.add_argument("old_font", type=str, help="Font before the change.")
+    parser.add_argument("new_font", type=str, help="Font after the change.")
+    parser.add_argument(
+        "--html",
+        type=str,
+        required=False,
+        help="Write the changed glyphs side by side to this html.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of processes hashing glyphs. Defaults to the number of CPUs.",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="List every changed codepoint.",
+    )
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    old_path = Path(args.old_font)
+    new_path = Path(args.new_font)
+    diff = diff_fonts(old_path, new_path, args.jobs)
+    print_report(diff, args.verbose)
+
+    if args.html is not None:
+        write_html(diff, old_path, new_path, Path(args.html))
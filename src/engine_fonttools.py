@@ -0,0 +1,402 @@
+import math
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+import fontforge
+from fontTools.fontBuilder import FontBuilder
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.tables import ttProgram
+from fontTools.ttLib.tables._g_l_y_f import Glyph as TTGlyph
+from fontTools.ttLib.tables.O_S_2f_2 import Panose
+
+from . import engine_numpy
+from .build_nerd import build_shaped_nerd
+from .modify_bizud import embolden, modify_zenkaku_space
+from .modify_hack import modify_m, modify_vline, modify_zero
+from .parameter import GlyphShape, Parameter
+from .tracing import count, stage
+from .utils import TransformPlan, log
+
+# Language IDs
+US = 0x0409  # en-US English (US)
+JP = 0x0411  # ja-JP Japanese
+
+PANOSE_FIELDS = [
+    "bFamilyType",
+    "bSerifStyle",
+    "bWeight",
+    "bProportion",
+    "bContrast",
+    "bStrokeVariation",
+    "bArmStyle",
+    "bLetterForm",
+    "bMidline",
+    "bXHeight",
+]
+
+
+class GlyphProxy:
+    """The part of the fontforge glyph API that `TransformPlan` relies on."""
+
+    def __init__(self, font: TTFont, name: str, ascent: int, descent: int) -> None:
+        self.tt_font = font
+        self.name = name
+        self.glyph = font["glyf"][name]
+        self.font = SimpleNamespace(ascent=ascent, descent=descent)
+
+    @property
+    def width(self) -> int:
+        return self.tt_font["hmtx"][self.name][0]
+
+    @width.setter
+    def width(self, width: int) -> None:
+        _, lsb = self.tt_font["hmtx"][self.name]
+        self.tt_font["hmtx"][self.name] = (width, lsb)
+
+    def boundingBox(self) -> tuple[float, ...]:
+        if self.glyph.numberOfContours == 0:
+            return (0, 0, 0, 0)
+
+        xs = [x for x, _ in self.glyph.coordinates]
+        ys = [y for _, y in self.glyph.coordinates]
+        return (min(xs), min(ys), max(xs), max(ys))
+
+    def transform(self, matrix: tuple[float, ...]) -> None:
+        transform_glyph(self.tt_font, self.name, matrix)
+
+
+def transform_glyph(font: TTFont, name: str, matrix: tuple[float, ...]) -> None:
+    """Apply a psMat-style matrix to a simple glyph of `font`."""
+    glyph = font["glyf"][name]
+    if glyph.numberOfContours == 0:
+        return
+
+    xx, xy, yx, yy, dx, dy = matrix
+    glyph.coordinates.transform(((xx, xy), (yx, yy)))
+    glyph.coordinates.translate((dx, dy))
+    glyph.recalcBounds(font["glyf"])
+
+    width, _ = font["hmtx"][name]
+    font["hmtx"][name] = (width, glyph.xMin)
+
+
+def prepare(font: TTFont) -> None:
+    """Decompose composite glyphs and drop hinting so outlines can move freely."""
+    glyf = font["glyf"]
+    empty_program = ttProgram.Program()
+    empty_program.fromBytecode(b"")
+
+    for name in font.getGlyphOrder():
+        glyph = glyf[name]
+        if glyph.isComposite():
+            coordinates, end_points, flags = glyph.getCoordinates(glyf)
+            simple = TTGlyph()
+            simple.numberOfContours = len(end_points)
+            simple.coordinates = coordinates
+            simple.endPtsOfContours = list(end_points)
+            simple.flags = flags
+            simple.program = empty_program
+            glyf[name] = simple
+        elif glyph.numberOfContours > 0:
+            glyph.program = empty_program
+
+
+def open_ttf(path: Path) -> TTFont:
+    with stage(f"open {path.name}"):
+        font = TTFont(str(path))
+        prepare(font)
+
+    return font
+
+
+def open_with_fontforge(font: TTFont, tmp_dir: Path, name: str) -> fontforge.font:
+    path = tmp_dir / f"{name}.ttf"
+    font.save(str(path))
+    return fontforge.open(str(path))
+
+
+def close_with_fontforge(font: fontforge.font, tmp_dir: Path, name: str) -> TTFont:
+    path = tmp_dir / f"{name}.out.ttf"
+    font.generate(str(path))
+    font.close()
+    return open_ttf(path)
+
+
+def reshape(
+    font: TTFont,
+    shape_as: GlyphShape,
+    shape_to: GlyphShape,
+    full_width: bool,
+    baseline_shift: float = 0,
+) -> None:
+    """Same reshape as modify_hack / modify_bizud, on glyf coordinates."""
+    em = font["head"].unitsPerEm
+    for name in font.getGlyphOrder():
+        glyph = GlyphProxy(font, name, shape_as.ascent, shape_as.descent)
+        if full_width and glyph.width > em / 2:
+            source_width = shape_as.full_width
+            target_width = shape_to.full_width
+        elif glyph.width > 0:
+            source_width = shape_as.half_width
+            target_width = shape_to.half_width
+        else:
+            continue
+
+        plan = TransformPlan(glyph)
+        if baseline_shift != 0:
+            plan.translate(0, baseline_shift)
+        plan.resize_width(source_width, rescale_glyph=False)
+        plan.fit(target_width, shape_to.ascent, shape_to.descent)
+        plan.apply()
+        count(glyphs=1)
+
+
+def italicize(font: TTFont, skew: float) -> None:
+    matrix = (1, 0, math.tan(skew), 1, 0, 0)  # psMat.skew
+    for name in font.getGlyphOrder():
+        transform_glyph(font, name, matrix)
+        count(glyphs=1, calls=1)
+
+
+def modify_hack_tt(
+    parameter: Parameter,
+    source_fonts_dir: Path,
+    tmp_dir: Path,
+    vectorized: bool = False,
+) -> TTFont:
+    config = parameter.hack
+    source = source_fonts_dir / config.source
+    if config.m_cutoff > 0 or config.dot_zero or config.broken_vline:
+        # these need boolean operations, so they stay in fontforge
+        with stage("fontforge Hack"):
+            hack_ff = fontforge.open(str(source))
+            if config.m_cutoff > 0:
+                modify_m(hack_ff, config.m_cutoff)
+            if config.dot_zero:
+                modify_zero(hack_ff)
+            if config.broken_vline:
+                modify_vline(hack_ff)
+            hack = close_with_fontforge(hack_ff, tmp_dir, "hack")
+    else:
+        hack = open_ttf(source)
+
+    with stage("fit Hack"):
+        reshape_font = engine_numpy.reshape if vectorized else reshape
+        reshape_font(hack, config.shape_as, parameter.shape_to, full_width=False)
+
+    return hack
+
+
+def modify_bizud_tt(
+    parameter: Parameter,
+    source_fonts_dir: Path,
+    tmp_dir: Path,
+    weight_shards: int = 1,
+    vectorized: bool = False,
+) -> TTFont:
+    config = parameter.bizud
+    bizud = open_ttf(source_fonts_dir / config.source)
+
+    with stage("fit BIZUD"):
+        reshape_font = engine_numpy.reshape if vectorized else reshape
+        reshape_font(
+            bizud,
+            config.shape_as,
+            parameter.shape_to,
+            full_width=True,
+            baseline_shift=config.baseline_shift,
+        )
+
+    if config.visualize_zenkaku_space or config.weight != 0:
+        # fit is linear, so the zenkaku space glyphs can be combined after it
+        with stage("fontforge BIZUD"):
+            bizud_ff = open_with_fontforge(bizud, tmp_dir, "bizud")
+            if config.visualize_zenkaku_space:
+                modify_zenkaku_space(bizud_ff)
+            if config.weight != 0:
+                target_widths = {
+                    glyph.glyphname: glyph.width
+                    for glyph in bizud_ff.glyphs()
+                    if glyph.width > 0
+                }
+                embolden(bizud_ff, target_widths, config.weight, weight_shards)
+            bizud = close_with_fontforge(bizud_ff, tmp_dir, "bizud")
+
+    return bizud
+
+
+def resolve_os2_table(os2_table: dict, ascent: int, descent: int) -> dict:
+    """Values of set_os2_table's fontforge attributes as they end up in the font."""
+    values = {
+        "os2_typoascent": ascent,
+        "os2_winascent": ascent,
+        "hhea_ascent": ascent,
+        "os2_typodescent": -descent,
+        "os2_windescent": descent,
+        "hhea_descent": -descent,
+        "os2_typolinegap": 0,
+        "hhea_linegap": 0,
+        **os2_table,
+    }
+    bases = {
+        "os2_typoascent": ascent,
+        "os2_winascent": ascent,
+        "hhea_ascent": ascent,
+        "os2_typodescent": -descent,
+        "os2_windescent": descent,
+        "hhea_descent": -descent,
+    }
+    for key, base in bases.items():
+        if values.get(f"{key}_add"):
+            values[key] += base
+
+    return values
+
+
+def merge(
+    parameter: Parameter,
+    fonts: list[TTFont],
+    version: str,
+    copyright_file: str | None,
+    license_url: str | None,
+) -> TTFont:
+    """Merge `fonts` by cmap, earlier fonts taking priority."""
+    notdef_font = next(font for font in fonts if ".notdef" in font["glyf"])
+    glyph_order = [".notdef"]
+    glyphs = {".notdef": notdef_font["glyf"][".notdef"]}
+    metrics = {".notdef": notdef_font["hmtx"][".notdef"]}
+    cmap: dict[int, str] = {}
+    coverage = parameter.coverage
+    for i, font in enumerate(fonts):
+        renamed: dict[str, str] = {}
+        for unicode, name in font.getBestCmap().items():
+            if unicode in cmap:
+                continue
+            if coverage is not None and not coverage.covers(unicode):
+                continue
+
+            if name not in renamed:
+                new_name = name if name not in glyphs else f"{name}.{i}"
+                renamed[name] = new_name
+                glyph_order.append(new_name)
+                glyphs[new_name] = font["glyf"][name]
+                metrics[new_name] = font["hmtx"][name]
+            cmap[unicode] = renamed[name]
+
+    shape = parameter.shape_to
+    os2 = resolve_os2_table(parameter.os2_table, shape.ascent, shape.descent)
+    family_name = parameter.family_name
+    style_name = parameter.style_name
+
+    builder = FontBuilder(shape.ascent + shape.descent, isTTF=True)
+    builder.setupGlyphOrder(glyph_order)
+    builder.setupCharacterMap(cmap)
+    builder.setupGlyf(glyphs)
+    builder.setupHorizontalMetrics(metrics)
+    builder.setupHorizontalHeader(
+        ascent=os2["hhea_ascent"],
+        descent=os2["hhea_descent"],
+        lineGap=os2["hhea_linegap"],
+    )
+    builder.setupNameTable(
+        {
+            "familyName": family_name,
+            "styleName": style_name,
+            "uniqueFontIdentifier": f"{family_name} {style_name} {version}",
+            "fullName": f"{family_name} {style_name}",
+            "psName": f"{family_name}-{style_name}".replace(" ", ""),
+            "version": f"Version {version}",
+        },
+        mac=False,
+    )
+    name_table = builder.font["name"]
+    for lang in [US, JP]:
+        if copyright_file is not None:
+            name_table.setName(open(copyright_file).read(), 0, 3, 1, lang)
+        if license_url is not None:
+            name_table.setName(license_url, 14, 3, 1, lang)
+
+    panose = Panose()
+    for field, value in zip(PANOSE_FIELDS, os2.get("os2_panose", [0] * 10)):
+        setattr(panose, field, value)
+    builder.setupOS2(
+        usWeightClass=os2.get("os2_weight", 400),
+        usWidthClass=os2.get("os2_width", 5),
+        fsSelection=os2.get("os2_stylemap", 0x40),
+        sTypoAscender=os2["os2_typoascent"],
+        sTypoDescender=os2["os2_typodescent"],
+        sTypoLineGap=os2["os2_typolinegap"],
+        usWinAscent=os2["os2_winascent"],
+        usWinDescent=os2["os2_windescent"],
+        panose=panose,
+    )
+    builder.font["OS/2"].recalcAvgCharWidth(builder.font)
+    builder.font["OS/2"].recalcUnicodeRanges(builder.font)
+    builder.setupPost(underlinePosition=parameter.upos, isFixedPitch=1)
+
+    head = builder.font["head"]
+    head.fontRevision = float(version)
+    head.macStyle = (0x01 if os2.get("os2_stylemap", 0) & 0x20 else 0) | (
+        0x02 if os2.get("os2_stylemap", 0) & 0x01 else 0
+    )
+
+    return builder.font
+
+
+def build_pennywort_fonttools(
+    parameter: Parameter,
+    source_fonts_dir: Path,
+    version: str,
+    copyright_file: str | None,
+    license_url: str | None,
+    weight_shards: int = 1,
+    vectorized: bool = False,
+) -> TTFont:
+    """Build Pennywort with fontTools geometry.
+
+    fontforge is only used for the boolean operations of the Hack and
+    zenkaku space tweaks and for changeWeight. With `vectorized`, the reshape
+    and italic passes run on whole fonts at once with NumPy.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+
+        log("Modify Hack")
+        with stage("Hack"):
+            hack = modify_hack_tt(parameter, source_fonts_dir, tmp_dir, vectorized)
+
+        log("Modify BIZUD")
+        with stage("BIZUD"):
+            bizud = modify_bizud_tt(
+                parameter,
+                source_fonts_dir,
+                tmp_dir,
+                weight_shards,
+                vectorized,
+            )
+
+        if parameter.skew:
+            with stage("italicize"):
+                italicize_font = engine_numpy.italicize if vectorized else italicize
+                italicize_font(hack, parameter.skew)
+                italicize_font(bizud, parameter.skew)
+
+        log("Modify Nerd Font")
+        with stage("Nerd Font"):
+            nerd = open_ttf(
+                build_shaped_nerd(
+                    source_fonts_dir / parameter.nerd.source, parameter.shape_to
+                )
+            )
+
+        log("Merge fonts")
+        with stage("merge"):
+            # NerdFont first to prioritize its powerline glyph
+            return merge(
+                parameter,
+                [nerd, hack, bizud],
+                version,
+                copyright_file,
+                license_url,
+            )
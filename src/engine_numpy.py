@@ -0,0 +1,131 @@
+import numpy as np
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.tables._g_l_y_f import GlyphCoordinates
+
+from .parameter import GlyphShape
+from .tracing import count
+
+
+class OutlineArray:
+    """Coordinates of all glyphs of a font in one contiguous array.
+
+    Glyph `i` owns `coordinates[offsets[i] : offsets[i + 1]]`. Matrices are
+    psMat-style `(xx, xy, yx, yy, dx, dy)` rows, one per glyph.
+    """
+
+    def __init__(self, font: TTFont) -> None:
+        self.font = font
+        self.names = font.getGlyphOrder()
+
+        glyf = font["glyf"]
+        chunks = []
+        counts = np.zeros(len(self.names), dtype=np.int64)
+        for i, name in enumerate(self.names):
+            glyph = glyf[name]
+            if glyph.numberOfContours > 0:
+                chunk = np.frombuffer(glyph.coordinates.array, dtype=np.float64)
+                chunks.append(chunk)
+                counts[i] = len(chunk) // 2
+
+        self.offsets = np.zeros(len(self.names) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.offsets[1:])
+        self.coordinates = (
+            np.concatenate(chunks).reshape(-1, 2) if chunks else np.zeros((0, 2))
+        )
+        self.glyph_index = np.repeat(np.arange(len(self.names)), counts)
+        self.widths = np.array([font["hmtx"][name][0] for name in self.names])
+
+    def transform(self, matrices: np.ndarray) -> None:
+        """Apply `matrices` of shape (glyphs, 6) with one batched matmul."""
+        linear = matrices[:, :4].reshape(-1, 2, 2)
+        shift = matrices[:, 4:]
+
+        # row vectors: [x, y] @ [[xx, xy], [yx, yy]] + [dx, dy]
+        index = self.glyph_index
+        self.coordinates = (
+            np.matmul(self.coordinates[:, None, :], linear[index])[:, 0, :]
+            + shift[index]
+        )
+
+    def write_back(self) -> None:
+        glyf = self.font["glyf"]
+        hmtx = self.font["hmtx"]
+
+        # reduceat needs strictly increasing starts, so only the non-empty glyphs
+        non_empty = np.flatnonzero(np.diff(self.offsets))
+        starts = self.offsets[non_empty]
+        mins = np.zeros((len(self.names), 2))
+        maxs = np.zeros((len(self.names), 2))
+        if len(starts):
+            mins[non_empty] = np.minimum.reduceat(self.coordinates, starts)
+            maxs[non_empty] = np.maximum.reduceat(self.coordinates, starts)
+
+        for i, name in enumerate(self.names):
+            start, stop = self.offsets[i], self.offsets[i + 1]
+            width = int(self.widths[i])
+            if start == stop:
+                _, lsb = hmtx[name]
+                hmtx[name] = (width, lsb)
+                continue
+
+            coordinates = GlyphCoordinates()
+            coordinates.array.frombytes(self.coordinates[start:stop].tobytes())
+
+            glyph = glyf[name]
+            glyph.coordinates = coordinates
+            # rounded like Glyph.recalcBounds
+            glyph.xMin, glyph.yMin = np.floor(mins[i] + 0.5).astype(int).tolist()
+            glyph.xMax, glyph.yMax = np.floor(maxs[i] + 0.5).astype(int).tolist()
+            hmtx[name] = (width, glyph.xMin)
+
+
+def reshape(
+    font: TTFont,
+    shape_as: GlyphShape,
+    shape_to: GlyphShape,
+    full_width: bool,
+    baseline_shift: float = 0,
+) -> None:
+    """Vectorized `engine_fonttools.reshape`.
+
+    The `TransformPlan` steps collapse to x' = (x + dx1) * scale + dx2 and
+    y' = (y + baseline_shift) * scale, with fontforge's int widths in between.
+    """
+    outlines = OutlineArray(font)
+    widths = outlines.widths
+
+    em = font["head"].unitsPerEm
+    is_full = (widths > em / 2) if full_width else np.zeros(len(widths), dtype=bool)
+    source_width = np.where(is_full, shape_as.full_width, shape_as.half_width)
+    target_width = np.where(is_full, shape_to.full_width, shape_to.half_width)
+    active = widths > 0
+
+    # resize_width(source_width, rescale_glyph=False)
+    dx1 = (source_width - widths) / 2
+    # fit(target_width, ...)
+    scale = np.minimum(
+        target_width / source_width,
+        min(shape_to.ascent / shape_as.ascent, shape_to.descent / shape_as.descent),
+    )
+    dx2 = (target_width - np.trunc(source_width * scale)) / 2
+
+    matrices = np.zeros((len(widths), 6))
+    matrices[:, 0] = scale
+    matrices[:, 3] = scale
+    matrices[:, 4] = dx1 * scale + dx2
+    matrices[:, 5] = baseline_shift * scale
+    matrices[~active] = (1, 0, 0, 1, 0, 0)
+
+    outlines.transform(matrices)
+    outlines.widths = np.where(active, target_width, widths)
+    outlines.write_back()
+    n = int(active.sum())
+    count(glyphs=n, calls=1)
+
+
+def italicize(font: TTFont, skew: float) -> None:
+    outlines = OutlineArray(font)
+    matrices = np.tile((1, 0, np.tan(skew), 1, 0, 0), (len(outlines.names), 1))
+    outlines.transform(matrices)
+    outlines.write_back()
+    count(glyphs=len(outlines.names), calls=1)
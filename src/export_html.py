@@ -1,7 +1,11 @@
 import argparse
+import os
+import re
+from pathlib import Path
+from typing import Iterable, Iterator
 
-import fontforge
-from fontforge import font as Font
+from .font_info import FontInfo, read_font_info
+from .webfont import Subset, export_webfonts, plan_subsets
 
 CELL_SIZE = 48
 NUM_COLUMNS = 16
@@ -39,13 +43,37 @@ sample_sentences = [
     ),
 ]
 
+
+def sample_codepoints() -> list[int]:
+    """Codepoints shown in `sample_sentences`, markup excluded."""
+    tag = re.compile("</?[a-z][^>]*>")
+    text = "".join(tag.sub("", sentence) for sentence in sample_sentences)
+    return sorted({ord(char) for char in text})
+
+
+font_face_template = "\n".join(
+    [
+        "{indent}@font-face {{",
+        "{indent}  font-family: '{font_family}';",
+        "{indent}  src: url('{font_path}');",
+        "{indent}}}",
+    ]
+)
+
+subset_font_face_template = "\n".join(
+    [
+        "{indent}@font-face {{",
+        "{indent}  font-family: '{font_family}';",
+        "{indent}  src: url('{font_path}') format('woff2');",
+        "{indent}  unicode-range: {unicode_range};",
+        "{indent}}}",
+    ]
+)
+
 style_template = "\n".join(
     [
         "{indent}<style>",
-        "{indent}  @font-face {{",
-        "{indent}    font-family: '{font_family}';",
-        "{indent}    src: url('{font_path}');",
-        "{indent}  }}",
+        "{font_faces}",
         "{indent}  body {{",
         "{indent}    font-family: '{font_family}';",
         "{indent}  }}",
@@ -111,6 +139,11 @@ style_template = "\n".join(
         "{indent}    border-left: solid blue;",
         "{indent}    border-right: solid blue;",
         "{indent}  }}",
+        "{indent}  .blank {{",
+        "{indent}    width: {font_size};",
+        "{indent}    vertical-align: top;",
+        "{indent}    color: gray;",
+        "{indent}  }}",
         "{indent}</style>",
     ]
 )
@@ -131,135 +164,236 @@ td_template = "\n".join(
 )
 
 
-def create_glyph_table(font: Font, indent: str = "") -> str:
-    glyphs = sorted(
-        [
-            glyph
-            for glyph in font.glyphs()
-            if glyph.isWorthOutputting and glyph.unicode >= 0
-        ],
-        key=lambda glyph: glyph.unicode,
-    )
+blank_td_template = "{indent}<td class='blank'><div>{label}</div></td>"
+
 
-    table_lines = [f"{indent}<table>"]
-    i = 0
-    prev_unicode = None
-    for glyph in glyphs:
-        col_index = glyph.unicode % NUM_COLUMNS
-        row_start = glyph.unicode - col_index
-
-        # tail blank
-        if prev_unicode and glyph.unicode - prev_unicode != 1:
-            j = 1
-            while i < NUM_COLUMNS and i != col_index:
-                table_lines.append(
-                    td_template.format(
-                        indent=f"{indent}    ",
-                        label=hex(prev_unicode + j),
-                        text="&nbsp;",
-                        width=0,
-                        border_width=0,
-                    )
+def iter_glyph_table(
+    widths: dict[int, int],
+    unicodes: tuple[int, ...],
+    em: int,
+    indent: str = "",
+) -> Iterator[str]:
+    """Rows of the glyphs in `unicodes`, cells without a glyph kept compact."""
+    yield f"{indent}<table>"
+    covered = set(unicodes)
+    for row_start in sorted({unicode - unicode % NUM_COLUMNS for unicode in unicodes}):
+        yield f"{indent}  <tr>"
+        for unicode in range(row_start, row_start + NUM_COLUMNS):
+            if unicode in covered:
+                yield td_template.format(
+                    indent=f"{indent}    ",
+                    label=hex(unicode),
+                    text=f"&#{unicode};",
+                    width=f"{widths[unicode] / em * 100}%",
+                    border_width="1px",
                 )
-                i += 1
-                j += 1
-
-        # row end
-        if i >= NUM_COLUMNS:
-            table_lines.append(f"{indent}  </tr>")
-            i = 0
-
-        # row start
-        if i == 0:
-            table_lines.append(f"{indent}  <tr>")
-
-        # head blank
-        while i < col_index:
-            table_lines.append(
-                td_template.format(
+            else:
+                yield blank_td_template.format(
                     indent=f"{indent}    ",
-                    label=hex(row_start + i),
-                    text="&nbsp;",
-                    width=0,
-                    border_width=0,
+                    label=hex(unicode),
+                )
+        yield f"{indent}  </tr>"
+    yield f"{indent}</table>"
+
+
+def create_font_faces(
+    font_family: str,
+    webfonts: list[tuple[Path, Subset | None]],
+    html_dir: Path,
+    indent: str = "",
+) -> str:
+    faces = []
+    for path, subset in webfonts:
+        url = Path(os.path.relpath(path, html_dir)).as_posix()
+        if subset is None:
+            faces.append(
+                font_face_template.format(
+                    indent=indent,
+                    font_family=font_family,
+                    font_path=url,
                 )
             )
-            i += 1
-
-        # cuurent glyph
-        table_lines.append(
-            td_template.format(
-                indent=f"{indent}    ",
-                label=hex(glyph.unicode),
-                text=f"&#{glyph.encoding};",
-                width=f"{glyph.width / font.em * 100}%",
-                border_width="1px",
+        else:
+            faces.append(
+                subset_font_face_template.format(
+                    indent=indent,
+                    font_family=font_family,
+                    font_path=url,
+                    unicode_range=subset.unicode_range,
+                )
             )
+
+    return "\n".join(faces)
+
+
+def iter_head(
+    info: FontInfo,
+    title: str,
+    webfonts: list[tuple[Path, Subset | None]],
+    html_dir: Path,
+) -> Iterator[str]:
+    yield "<!DOCTYPE html>"
+    yield "<html lang='en'>"
+    yield "<head>"
+    yield "  <meta charset='UTF-8' />"
+    yield style_template.format(
+        indent="  ",
+        font_faces=create_font_faces(info.fontname, webfonts, html_dir, "    "),
+        font_family=info.fontname,
+        font_size=f"{CELL_SIZE}px",
+        baseline=f"{info.ascent / info.em * 100}%",
+        sample_foreground_color=SAMPLE_FG_COLOR,
+        sample_background_color=SAMPLE_BG_COLOR,
+    )
+    yield "  <body>"
+    yield f"    <h1>{title}</h1>"
+
+
+def iter_index(
+    info: FontInfo,
+    webfonts: list[tuple[Path, Subset | None]],
+    html_dir: Path,
+    pages: list[tuple[Path, Subset]],
+) -> Iterator[str]:
+    yield from iter_head(info, info.fullname, webfonts, html_dir)
+    yield "    <div class='p-4'>"
+    yield "    <div class='p-4'>"
+    yield "      <h2>Samples</h2>"
+    yield "      <div class='sample-container'>"
+    for sentense in sample_sentences:
+        yield f"        <div>{sentense}</div>"
+    yield "      </div>"
+    yield "    </div>"
+    yield "    <div class='p-4'>"
+    yield "      <h2>All Glyphs</h2>"
+    yield "      <ul>"
+    for page_path, page in pages:
+        url = Path(os.path.relpath(page_path, html_dir)).as_posix()
+        first, last = page.unicodes[0], page.unicodes[-1]
+        yield (
+            f"        <li><a href='{url}'>{page.name}</a> "
+            + f"{hex(first)}~{hex(last)} ({len(page.unicodes)} glyphs)</li>"
         )
+    yield "      </ul>"
+    yield "    </div>"
+    yield "    </div>"
+    yield "  </body>"
+    yield "</html>"
 
-        prev_unicode = glyph.unicode
-        i += 1
 
-    table_lines += [
-        f"{indent}  </tr>",
-        f"{indent}</table>",
+def iter_page(
+    info: FontInfo,
+    webfonts: list[tuple[Path, Subset | None]],
+    html_dir: Path,
+    page: Subset,
+    index_path: Path,
+) -> Iterator[str]:
+    # only the subset shown on this page is fetched
+    page_webfonts = [
+        (path, subset)
+        for path, subset in webfonts
+        if subset is None or subset.name == page.name
     ]
+    index_url = Path(os.path.relpath(index_path, html_dir)).as_posix()
 
-    return "\n".join(table_lines)
-
-
-def export_html(font_path: str) -> None:
-    font = fontforge.open(font_path)
-
-    print(
-        "\n".join(
-            [
-                "<!DOCTYPE html>",
-                "<html lang='en'>",
-                "<head>",
-                "  <meta charset='UTF-8' />",
-                style_template.format(
-                    indent="  ",
-                    font_family=font.fontname,
-                    font_path=font_path,
-                    font_size=f"{CELL_SIZE}px",
-                    baseline=f"{font.ascent / font.em * 100}%",
-                    sample_foreground_color=SAMPLE_FG_COLOR,
-                    sample_background_color=SAMPLE_BG_COLOR,
-                ),
-                "  <body>",
-                "    <h1>{title}</h1>".format(title=font.fullname),
-                "    <div class='p-4'>",
-                "    <div class='p-4'>",
-                "      <h2>Samples</h2>",
-                "      <div class='sample-container'>",
-                *[f"        <div>{sentense}</div>" for sentense in sample_sentences],
-                "      </div>",
-                "    </div>",
-                "    <div class='p-4'>",
-                "      <h2>All Glyphs</h2>",
-                "      <div class='p-4'>",
-                create_glyph_table(font, indent="        "),
-                "      </div>",
-                "    </div>",
-                "    </div>",
-                "  </body>",
-                "</html>",
-            ]
-        )
+    yield from iter_head(info, f"{info.fullname} {page.name}", page_webfonts, html_dir)
+    yield f"    <a href='{index_url}'>Index</a>"
+    yield "    <div class='p-4'>"
+    yield from iter_glyph_table(
+        info.widths_by_codepoint, page.unicodes, info.em, "      "
     )
+    yield "    </div>"
+    yield "  </body>"
+    yield "</html>"
+
+
+def write_lines(path: Path, lines: Iterable[str]) -> None:
+    """Stream `lines` into `path`, replacing it once complete."""
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with open(tmp_path, "w") as f:
+        for line in lines:
+            f.write(line + "\n")
+    tmp_path.replace(path)
+
+
+def export_html(
+    font_path: Path,
+    output_path: Path,
+    webfont_dir: Path | None = None,
+    jobs: int | None = None,
+) -> None:
+    """Write the preview of `font_path` as an index page and per-block pages.
+
+    The index at `output_path` has the samples and links to the glyph table
+    pages, which go in a directory of the same name. With `webfont_dir`, the
+    font is loaded as WOFF2 subsets and each page only needs its own.
+    """
+    info = read_font_info(font_path)
+
+    webfonts: list[tuple[Path, Subset | None]] = [(font_path, None)]
+    if webfont_dir is not None:
+        webfonts = list(export_webfonts(font_path, info.codepoints, webfont_dir, jobs))
+
+    page_dir = output_path.parent / output_path.stem
+    page_dir.mkdir(parents=True, exist_ok=True)
+    pages = [
+        (page_dir / f"{page.name}.html", page) for page in plan_subsets(info.codepoints)
+    ]
+    page_paths = {page_path for page_path, _ in pages}
+    for old_page in page_dir.glob("*.html"):
+        if old_page not in page_paths:
+            old_page.unlink()
+
+    for page_path, page in pages:
+        write_lines(
+            page_path,
+            iter_page(info, webfonts, page_dir, page, output_path),
+        )
+    write_lines(output_path, iter_index(info, webfonts, output_path.parent, pages))
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Export font preview as html.",
-        usage="python export_html.py /path/to/font/file",
+        usage="python -m src.export_html /path/to/font/file --output preview.html",
     )
     parser.add_argument("font_file", type=str, help="Path to font.ttf.")
+    parser.add_argument(
+        "--output",
+        type=str,
+        required=True,
+        help="Index html to write, the glyph pages go next to it.",
+    )
+    parser.add_argument(
+        "--webfont-dir",
+        type=str,
+        required=False,
+        help="Where the WOFF2 subsets go. Defaults to webfonts/ next to the html.",
+    )
+    parser.add_argument(
+        "--no-webfont",
+        action="store_true",
+        help="Load the whole font file instead of WOFF2 subsets.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of subsets built at once. Defaults to the number of CPUs.",
+    )
 
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     args = parse_args()
-    export_html(args.font_file)
+
+    output_path = Path(args.output)
+    webfont_dir = None
+    if not args.no_webfont:
+        if args.webfont_dir is not None:
+            webfont_dir = Path(args.webfont_dir)
+        else:
+            webfont_dir = output_path.parent / "webfonts"
+
+    export_html(Path(args.font_file), output_path, webfont_dir, args.jobs)
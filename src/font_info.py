@@ -0,0 +1,62 @@
+import mmap
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+
+from fontTools.ttLib import TTFont
+
+
+@dataclass(frozen=True)
+class FontInfo:
+    fontname: str
+    fullname: str
+    family_name: str
+    style_name: str
+    em: int
+    ascent: int
+    descent: int
+    codepoints: list[int]  # sorted
+    widths: list[int]  # advance widths, aligned with `codepoints`
+
+    @cached_property
+    def widths_by_codepoint(self) -> dict[int, int]:
+        return dict(zip(self.codepoints, self.widths))
+
+
+def read_font_info(path: Path) -> FontInfo:
+    """Metadata and advance widths of a TTF without parsing any outline.
+
+    Only the name, head, hhea, OS/2, cmap and hmtx tables are decompiled,
+    from a memory-mapped file.
+    """
+    with (
+        open(path, "rb") as f,
+        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data,
+    ):
+        font = TTFont(data, lazy=True)
+        name = font["name"]
+        cmap = font.getBestCmap()
+        hmtx = font["hmtx"]
+
+        if "OS/2" in font:
+            ascent = font["OS/2"].sTypoAscender
+            descent = -font["OS/2"].sTypoDescender
+        else:
+            ascent = font["hhea"].ascent
+            descent = -font["hhea"].descent
+
+        codepoints = sorted(cmap)
+        info = FontInfo(
+            fontname=name.getDebugName(6) or path.stem,
+            fullname=name.getDebugName(4) or path.stem,
+            family_name=name.getDebugName(1) or "",
+            style_name=name.getDebugName(2) or "",
+            em=font["head"].unitsPerEm,
+            ascent=ascent,
+            descent=descent,
+            codepoints=codepoints,
+            widths=[hmtx[cmap[codepoint]][0] for codepoint in codepoints],
+        )
+        font.close()
+
+    return info
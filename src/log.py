@@ -0,0 +1,6 @@
+from datetime import datetime
+
+
+def log(msg: str) -> None:
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{now}] {msg}")
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+SRC_DIR = Path(__file__).parent
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def hash_code(src_dir: Path = SRC_DIR, modules: list[str] | None = None) -> str:
+    paths = src_dir.glob("*.py") if modules is None else map(src_dir.joinpath, modules)
+
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(path.name.encode())
+        digest.update(hash_file(path).encode())
+
+    return digest.hexdigest()
+
+
+def read_env(path: Path) -> dict[str, str]:
+    env = {}
+    for line in path.read_text().splitlines():
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        env[key.strip()] = value.strip()
+
+    return env
+
+
+class BuildManifest:
+    """Input hashes of every output of the last successful builds."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.outputs: dict[str, dict] = {}
+        if path.exists():
+            self.outputs = json.loads(path.read_text()).get("outputs", {})
+
+    def check(self, output: Path, inputs: dict[str, str]) -> str | None:
+        """Return why `output` has to be rebuilt, or None if it is up to date."""
+        if not output.exists():
+            return "output missing"
+
+        entry = self.outputs.get(str(output))
+        if entry is None:
+            return "not in manifest"
+
+        changed = sorted(
+            key
+            for key in inputs.keys() | entry["inputs"].keys()
+            if inputs.get(key) != entry["inputs"].get(key)
+        )
+        if changed:
+            return "changed " + ", ".join(changed)
+
+        return None
+
+    def record(
+        self,
+        output: Path,
+        inputs: dict[str, str],
+        peak_rss: int | None = None,
+    ) -> None:
+        self.outputs[str(output)] = {
+            "inputs": inputs,
+            "built_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        if peak_rss is not None:
+            self.outputs[str(output)]["peak_rss_kib"] = peak_rss
+
+    def peak_rss(self, output: Path) -> int | None:
+        """Peak RSS in KiB of the last recorded build of `output`, if known."""
+        return self.outputs.get(str(output), {}).get("peak_rss_kib")
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({"outputs": self.outputs}, indent=2) + "\n")
+        os.replace(tmp_path, self.path)
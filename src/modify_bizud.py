@@ -1,68 +1,210 @@
-import psMat
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
 from fontforge import font as Font
+from fontforge import glyph as Glyph
 
 from .parameter import GlyphShape
-from .utils import copy_glyph, fit, remove_lookups, resize_width
+from .tracing import count, stage
+from .utils import (
+    Outline,
+    TransformPlan,
+    copy_glyphs,
+    dump_outline,
+    has_glyphs,
+    italicize,
+    load_outline,
+    log,
+    remove_lookups,
+)
 
 
 def modify_zenkaku_space(bizud: Font) -> None:
     space_unicode = 0x3000  # ideographic space
+    if not has_glyphs(bizud, [space_unicode, 0x25A1, 0x25C6]):
+        log("  skip modify_zenkaku_space, not covered")
+        return
 
-    copy_glyph(
-        (bizud, 0x25A1),  # white square
-        (bizud, space_unicode),
-        replace=True,
-    )
-    copy_glyph(
-        (bizud, 0x25C6),  # black diamond
-        (bizud, space_unicode),
-    )
+    copy_glyphs(bizud, bizud, {0x25A1: space_unicode}, replace=True)  # white square
+    copy_glyphs(bizud, bizud, {0x25C6: space_unicode})  # black diamond
 
     bizud.selection.select(space_unicode)
     bizud.intersect()
     bizud.selection.none()
 
 
-def modify_bizud(
+def fit_glyph(
+    glyph: Glyph,
+    original_em: int,
+    shape_as: GlyphShape,
+    shape_to: GlyphShape,
+    baseline_shift: float = 0,
+) -> int | None:
+    """Fit a glyph of a font whose ascent and descent are set to `shape_as`.
+
+    Returns the target width, or None for an empty-width glyph left untouched.
+    """
+    if glyph.width > original_em / 2:
+        source_width = shape_as.full_width
+        target_width = shape_to.full_width
+    elif glyph.width > 0:
+        source_width = shape_as.half_width
+        target_width = shape_to.half_width
+    else:
+        return None
+
+    plan = TransformPlan(glyph)
+    if baseline_shift != 0:
+        plan.translate(0, baseline_shift)
+
+    plan.resize_width(source_width, rescale_glyph=False)
+    plan.fit(target_width, shape_to.ascent, shape_to.descent)
+    plan.apply()
+    return target_width
+
+
+def embolden_glyph(glyph: Glyph, weight: float, target_width: int) -> None:
+    glyph.changeWeight(weight, "auto", 0, 0, "auto")
+    count(calls=1)
+    plan = TransformPlan(glyph)
+    plan.resize_width(target_width, rescale_glyph=False)
+    plan.apply()
+
+
+# font and modification inherited by the forked shard workers
+_shard_font: Font | None = None
+_shard_modify: Callable[[Glyph], bool] | None = None
+
+
+def modify_shard(glyph_names: list[str]) -> dict[str, tuple[int, Outline]]:
+    assert _shard_font is not None and _shard_modify is not None
+    results = {}
+    for glyph_name in glyph_names:
+        glyph = _shard_font[glyph_name]
+        if _shard_modify(glyph):
+            results[glyph_name] = (glyph.width, dump_outline(glyph))
+
+    return results
+
+
+def modify_glyphs(
+    font: Font,
+    glyph_names: list[str],
+    modify: Callable[[Glyph], bool],
+    shards: int = 1,
+) -> None:
+    """Run `modify` on the glyphs in order, in `shards` processes.
+
+    `modify` returns whether it changed the glyph. Glyphs without references
+    only depend on themselves, so they are split into contiguous encoding
+    ranges processed on forked copies of the font. Their outlines are then
+    written back in order, and glyphs with references are modified in place at
+    their turn, so that each one sees the others as the serial pass would.
+    """
+    global _shard_font, _shard_modify
+
+    independent = [name for name in glyph_names if not font[name].references]
+    if shards <= 1:
+        independent = []
+    results: dict[str, tuple[int, Outline]] = {}
+    if independent:
+        size = -(-len(independent) // shards)
+        chunks = [independent[i : i + size] for i in range(0, len(independent), size)]
+
+        _shard_font, _shard_modify = font, modify
+        try:
+            context = multiprocessing.get_context("fork")
+            with ProcessPoolExecutor(len(chunks), mp_context=context) as executor:
+                for shard in executor.map(modify_shard, chunks):
+                    results.update(shard)
+        finally:
+            _shard_font, _shard_modify = None, None
+
+    sharded = set(independent)
+    for glyph_name in glyph_names:
+        glyph = font[glyph_name]
+        if glyph_name in results:
+            width, outline = results[glyph_name]
+            load_outline(glyph, outline)
+            glyph.width = width
+            count(glyphs=1)
+        elif glyph_name not in sharded and modify(glyph):
+            count(glyphs=1)
+
+
+def embolden(
+    bizud: Font,
+    target_widths: dict[str, int],
+    weight: float,
+    shards: int = 1,
+) -> None:
+    """Apply changeWeight to the glyphs in `target_widths`, in `shards` processes."""
+
+    def modify(glyph: Glyph) -> bool:
+        embolden_glyph(glyph, weight, target_widths[glyph.glyphname])
+        return True
+
+    modify_glyphs(bizud, list(target_widths), modify, shards)
+
+
+def modify_bizud_upright(
     bizud: Font,
     shape_as: GlyphShape,
     shape_to: GlyphShape,
-    skew: float = 0,
     visualize_zenkaku_space: bool = True,
     baseline_shift: float = 0,
     weight: float = 0,
+    weight_shards: int = 1,
 ) -> None:
     if visualize_zenkaku_space:
-        modify_zenkaku_space(bizud)
+        with stage("modify_zenkaku_space"):
+            modify_zenkaku_space(bizud)
 
-    # reshape
+    # reshape and weight, one glyph after the other as glyphs with references
+    # are fitted by the boxes of the glyphs they refer to
     original_em = bizud.em
     bizud.ascent = shape_as.ascent
     bizud.descent = shape_as.descent
-    for glyph in bizud.glyphs():
-        if glyph.width > original_em / 2:
-            source_width = shape_as.full_width
-            target_width = shape_to.full_width
-        elif glyph.width > 0:
-            source_width = shape_as.half_width
-            target_width = shape_to.half_width
-        else:
-            continue
-
-        if baseline_shift != 0:
-            glyph.transform(psMat.translate((0, baseline_shift)))
-
-        resize_width(glyph, source_width, rescale_glyph=False)
-        fit(glyph, target_width, shape_to.ascent, shape_to.descent)
 
+    def modify(glyph: Glyph) -> bool:
+        target_width = fit_glyph(glyph, original_em, shape_as, shape_to, baseline_shift)
+        if target_width is None:
+            return False
         if weight != 0:
-            glyph.changeWeight(weight, "auto", 0, 0, "auto")
-            resize_width(glyph, target_width, rescale_glyph=False)
+            embolden_glyph(glyph, weight, target_width)
+        return True
 
-    # italic
-    if skew:
-        for glyph in bizud.glyphs():
-            if glyph.isWorthOutputting:
-                glyph.transform(psMat.skew(skew))
+    with stage("fit and changeWeight BIZUD" if weight != 0 else "fit BIZUD"):
+        glyph_names = [glyph.glyphname for glyph in bizud.glyphs()]
+        shards = weight_shards if weight != 0 else 1
+        modify_glyphs(bizud, glyph_names, modify, shards)
 
     remove_lookups(bizud)
+
+
+def modify_bizud(
+    bizud: Font,
+    shape_as: GlyphShape,
+    shape_to: GlyphShape,
+    skew: float = 0,
+    visualize_zenkaku_space: bool = True,
+    baseline_shift: float = 0,
+    weight: float = 0,
+    weight_shards: int = 1,
+) -> None:
+    modify_bizud_upright(
+        bizud,
+        shape_as,
+        shape_to,
+        visualize_zenkaku_space,
+        baseline_shift,
+        weight,
+        weight_shards,
+    )
+
+    # italic
+    if skew:
+        with stage("italicize BIZUD"):
+            n = italicize(bizud, skew)
+            count(glyphs=n)
@@ -1,17 +1,18 @@
 import psMat
 from fontforge import font as Font
+from fontforge import glyph as Glyph
 
 from .parameter import GlyphShape
-from .utils import (
-    copy_glyph,
-    draw_square,
-    fit,
-    resize_width,
-)
+from .tracing import count, stage
+from .utils import TransformPlan, copy_glyphs, draw_square, has_glyphs, italicize, log
 
 
 def modify_m(hack: Font, cutoff: int) -> None:
     m_unicode = 0x6D
+    if not has_glyphs(hack, [m_unicode]):
+        log("  skip modify_m, not covered")
+        return
+
     hack.selection.select(m_unicode)
     pen = hack[m_unicode].glyphPen(replace=False)
 
@@ -24,6 +25,10 @@ def modify_m(hack: Font, cutoff: int) -> None:
 
 def modify_zero(hack: Font) -> None:
     zero_unicode = 0x30
+    if not has_glyphs(hack, [zero_unicode, 0xB7]):
+        log("  skip modify_zero, not covered")
+        return
+
     hack.selection.select(zero_unicode)
     pen = hack[zero_unicode].glyphPen(replace=False)
 
@@ -34,49 +39,75 @@ def modify_zero(hack: Font) -> None:
     hack.selection.none()
 
     # copy middle dot
-    copy_glyph((hack, 0xB7), (hack, zero_unicode))
+    copy_glyphs(hack, hack, {0xB7: zero_unicode})
 
 
 def modify_vline(hack: Font) -> None:
     vline_unicode = 0x007C
+    if not has_glyphs(hack, [vline_unicode, 0x00A6]):
+        log("  skip modify_vline, not covered")
+        return
+
     vline = hack[vline_unicode]
 
     # copy broken bar
-    copy_glyph((hack, 0x00A6), (hack, vline_unicode), replace=True)
+    copy_glyphs(hack, hack, {0x00A6: vline_unicode}, replace=True)
 
     # move to top edge
     _, _, _, top = vline.boundingBox()
     vline.transform(psMat.translate((0, hack.ascent - top)))
 
 
-def modify_hack(
+def fit_glyph(glyph: Glyph, shape_as: GlyphShape, shape_to: GlyphShape) -> None:
+    plan = TransformPlan(glyph)
+    plan.resize_width(shape_as.half_width, rescale_glyph=False)
+    plan.fit(shape_to.half_width, shape_to.ascent, shape_to.descent)
+    plan.apply()
+
+
+def modify_hack_upright(
     hack: Font,
     shape_as: GlyphShape,
     shape_to: GlyphShape,
-    skew: float = 0,
     m_cutoff: int = 400,
     dot_zero: bool = True,
     broken_vline: bool = True,
 ) -> None:
     if m_cutoff > 0:
-        modify_m(hack, m_cutoff)
+        with stage("modify_m"):
+            modify_m(hack, m_cutoff)
 
     if dot_zero:
-        modify_zero(hack)
+        with stage("modify_zero"):
+            modify_zero(hack)
 
     if broken_vline:
-        modify_vline(hack)
+        with stage("modify_vline"):
+            modify_vline(hack)
 
     # reshape
     hack.ascent = shape_as.ascent
     hack.descent = shape_as.descent
-    for glyph in hack.glyphs():
-        if glyph.width:
-            resize_width(glyph, shape_as.half_width, rescale_glyph=False)
-            fit(glyph, shape_to.half_width, shape_to.ascent, shape_to.descent)
+    with stage("fit Hack"):
+        for glyph in hack.glyphs():
+            if glyph.width:
+                fit_glyph(glyph, shape_as, shape_to)
+                count(glyphs=1)
+
+
+def modify_hack(
+    hack: Font,
+    shape_as: GlyphShape,
+    shape_to: GlyphShape,
+    skew: float = 0,
+    m_cutoff: int = 400,
+    dot_zero: bool = True,
+    broken_vline: bool = True,
+) -> None:
+    modify_hack_upright(hack, shape_as, shape_to, m_cutoff, dot_zero, broken_vline)
 
     # italic
     if skew:
-        for glyph in hack.glyphs():
-            if glyph.isWorthOutputting:
-                glyph.transform(psMat.skew(skew))
+        with stage("italicize Hack"):
+            n = italicize(hack, skew)
+            count(glyphs=n)
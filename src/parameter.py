@@ -1,4 +1,7 @@
-from dataclasses import dataclass
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Iterable
 
 from dataclasses_json import DataClassJsonMixin
 
@@ -36,6 +39,64 @@ class NerdConfig(BaseConfig):
     pass
 
 
+def merge_ranges(ranges: Iterable[tuple[int, int]]) -> tuple[list[int], list[int]]:
+    """Sorted starts and stops of `ranges`, with overlapping ones merged."""
+    starts: list[int] = []
+    stops: list[int] = []
+    for start, stop in sorted(ranges):
+        if stops and start <= stops[-1] + 1:
+            stops[-1] = max(stops[-1], stop)
+        else:
+            starts.append(start)
+            stops.append(stop)
+
+    return starts, stops
+
+
+def in_ranges(merged: tuple[list[int], list[int]], unicode: int) -> bool:
+    starts, stops = merged
+    i = bisect_right(starts, unicode) - 1
+    return i >= 0 and unicode <= stops[i]
+
+
+@dataclass(frozen=True)
+class Coverage(DataClassJsonMixin):
+    """Codepoint ranges to build, as [start, stop] pairs.
+
+    Everything is included unless `include` is given, then `exclude` is taken
+    out of it.
+    """
+
+    include: list[tuple[int, int]] | None = None
+    exclude: list[tuple[int, int]] = field(default_factory=list)
+
+    @classmethod
+    def from_codepoints(cls, codepoints: Iterable[int]) -> "Coverage":
+        """Coverage of exactly `codepoints`, merging consecutive ones."""
+        include: list[tuple[int, int]] = []
+        for codepoint in sorted(set(codepoints)):
+            if include and include[-1][1] + 1 == codepoint:
+                include[-1] = (include[-1][0], codepoint)
+            else:
+                include.append((codepoint, codepoint))
+
+        return cls(include=include)
+
+    @cached_property
+    def _include(self) -> tuple[list[int], list[int]] | None:
+        return None if self.include is None else merge_ranges(self.include)
+
+    @cached_property
+    def _exclude(self) -> tuple[list[int], list[int]]:
+        return merge_ranges(self.exclude)
+
+    def covers(self, unicode: int) -> bool:
+        if self._include is not None and not in_ranges(self._include, unicode):
+            return False
+
+        return not in_ranges(self._exclude, unicode)
+
+
 @dataclass(frozen=True)
 class Parameter(DataClassJsonMixin):
     family_name: str
@@ -48,3 +109,4 @@ class Parameter(DataClassJsonMixin):
     hack: HackConfig
     bizud: BizudConfig
     nerd: NerdConfig
+    coverage: Coverage | None = None
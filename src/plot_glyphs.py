@@ -1,6 +1,13 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
 import matplotlib.pyplot as plt
+import numpy as np
 from fontforge import glyph as Glyph
 from fontTools.pens.basePen import BasePen
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PathCollection
+from matplotlib.figure import Figure
 from matplotlib.gridspec import GridSpec
 from matplotlib.patches import PathPatch as MplPathPatch
 from matplotlib.patches import Rectangle
@@ -123,3 +130,108 @@ def plot_glyphs(
         plt.savefig(fname)
     else:
         plt.show()
+
+
+@dataclass(frozen=True)
+class SheetCell:
+    label: str
+    width: float
+    path: MplPath | None  # picklable, unlike fontforge glyphs
+
+
+def create_sheet_cells(glyphs: list[Glyph]) -> list[SheetCell]:
+    cells = []
+    for glyph in glyphs:
+        pen = MplPathPen()
+        glyph.draw(pen)
+        label = hex(glyph.unicode) if glyph.unicode >= 0 else glyph.glyphname
+        cells.append(SheetCell(label, glyph.width, pen.getPath()))
+
+    return cells
+
+
+def render_sheet(
+    cells: list[SheetCell],
+    ascent: float,
+    descent: float,
+    ncols: int,
+    cell_inches: float,
+    fname: str,
+    dpi: int = 100,
+) -> None:
+    """Draw `cells` on a single Axes: one collection of glyphs, one of guides."""
+    cell_width = max([cell.width for cell in cells] + [ascent + descent])
+    cell_height = (ascent + descent) * 1.25  # room for the label
+    nrows = -(-len(cells) // ncols)
+
+    paths = []
+    segments = []
+    colors = []
+    for k, cell in enumerate(cells):
+        x = (k % ncols) * cell_width
+        y = -(k // ncols) * cell_height
+        if cell.path is not None:
+            vertices = np.asarray(cell.path.vertices) + np.array((x, y))
+            paths.append(MplPath(vertices, cell.path.codes))
+
+        for guide_y, color in [(0, "gray"), (ascent, "green"), (-descent, "red")]:
+            segments.append([(x, y + guide_y), (x + cell_width, y + guide_y)])
+            colors.append(color)
+        for guide_x in [0, cell.width]:
+            segments.append([(x + guide_x, y - descent), (x + guide_x, y + ascent)])
+            colors.append("blue")
+
+    figure = Figure(figsize=(ncols * cell_inches, nrows * cell_inches * 1.25))
+    FigureCanvasAgg(figure)
+    ax = figure.add_axes((0, 0, 1, 1))
+    ax.add_collection(LineCollection(segments, colors=colors, linewidths=0.5))
+    glyph_collection = PathCollection(paths, facecolors="black", edgecolors="none")
+    glyph_collection.set_transform(ax.transData)
+    ax.add_collection(glyph_collection)
+
+    fontsize = cell_inches * 72 / 8
+    for k, cell in enumerate(cells):
+        x = (k % ncols) * cell_width
+        y = -(k // ncols) * cell_height + ascent
+        ax.text(x, y, cell.label, fontsize=fontsize, va="bottom")
+
+    ax.set_xlim(0, ncols * cell_width)
+    ax.set_ylim(-(nrows - 1) * cell_height - descent, ascent + cell_height * 0.2)
+    ax.set_aspect("equal")
+    ax.set_axis_off()
+    figure.savefig(fname, dpi=dpi)
+
+
+def plot_contact_sheets(
+    glyphs: list[Glyph],
+    fname_format: str = "sheet-{page:03}.png",
+    ncols: int = 32,
+    nrows: int = 32,
+    cell_inches: float = 0.5,
+    jobs: int | None = None,
+) -> list[str]:
+    """Render `glyphs` as pages of `ncols` x `nrows` cells in a process pool.
+
+    Returns the file names of the pages.
+    """
+    if not glyphs:
+        return []
+
+    ascent = glyphs[0].font.ascent
+    descent = glyphs[0].font.descent
+    cells = create_sheet_cells(glyphs)
+
+    per_page = ncols * nrows
+    pages = [cells[i : i + per_page] for i in range(0, len(cells), per_page)]
+    fnames = [fname_format.format(page=page) for page in range(len(pages))]
+    with ProcessPoolExecutor(jobs) as executor:
+        futures = [
+            executor.submit(
+                render_sheet, page, ascent, descent, ncols, cell_inches, fname
+            )
+            for page, fname in zip(pages, fnames)
+        ]
+        for future in futures:
+            future.result()
+
+    return fnames
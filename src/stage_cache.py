@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+import fontforge
+from fontforge import font as Font
+
+from .manifest import SRC_DIR, hash_file
+from .utils import log
+
+STAGE_SUFFIX = ".sfd"
+
+
+def hash_config(config: Any) -> str:
+    if is_dataclass(config) and not isinstance(config, type):
+        config = asdict(config)
+
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+class StageCache:
+    """Content-addressed store of intermediate fonts saved as SFD.
+
+    Entries are keyed by everything that determines a stage's output and are
+    evicted least recently used first once the directory exceeds `max_size`.
+    `file_hashes` pins the hashes of source and code files by resolved path,
+    for a process that loaded them before they may have changed on disk.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_size: int,
+        file_hashes: dict[Path, str] | None = None,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.file_hashes = file_hashes or {}
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def hash_of(self, path: Path) -> str:
+        pinned = self.file_hashes.get(path.resolve())
+        return hash_file(path) if pinned is None else pinned
+
+    def make_key(
+        self,
+        stage: str,
+        sources: list[Path],
+        configs: list[Any],
+        code: list[str],
+    ) -> str:
+        digest = hashlib.sha256()
+        digest.update(stage.encode())
+        digest.update(fontforge.version().encode())
+        for source in sources:
+            digest.update(self.hash_of(source).encode())
+        for config in configs:
+            digest.update(hash_config(config).encode())
+        for module in code:
+            digest.update(self.hash_of(SRC_DIR / module).encode())
+
+        return f"{stage}-{digest.hexdigest()[:32]}"
+
+    def path_of(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{STAGE_SUFFIX}"
+
+    def load(self, key: str) -> Font | None:
+        path = self.path_of(key)
+        if not path.exists():
+            return None
+
+        os.utime(path)  # mark as recently used
+        return fontforge.open(str(path))
+
+    def store(self, key: str, font: Font) -> None:
+        path = self.path_of(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        font.save(str(tmp_path))
+        os.replace(tmp_path, path)
+        self.evict(keep=path)
+
+    def evict(self, keep: Path | None = None) -> None:
+        """Remove the least recently used entries over `max_size`, except `keep`."""
+        entries = []
+        for path in self.cache_dir.glob(f"*{STAGE_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            if path == keep:
+                continue
+
+            log(f"Evict {path.name}")
+            path.unlink(missing_ok=True)
+            total_size -= size
+
+        if keep is not None and total_size > self.max_size:
+            log(f"  {keep.name} exceeds the cache size, evicted by the next store")
+
+
+def run_stage(
+    cache: StageCache | None,
+    stage: str,
+    sources: list[Path],
+    configs: list[Any],
+    code: list[str],
+    build: Callable[[], Font],
+) -> Font:
+    if cache is None:
+        return build()
+
+    key = cache.make_key(stage, sources, configs, code)
+    font = cache.load(key)
+    if font is not None:
+        log(f"Load cached {key}")
+        return font
+
+    font = build()
+    cache.store(key, font)
+    log(f"Cache {key}")
+
+    return font
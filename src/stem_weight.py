@@ -0,0 +1,266 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from fontTools.pens.basePen import BasePen
+from fontTools.ttLib import TTFont
+
+Point = tuple[float, float]
+
+SCRIPTS: dict[str, list[tuple[int, int]]] = {
+    "latin": [(0x41, 0x5A), (0x61, 0x7A)],  # Hack
+    "kana": [(0x3041, 0x3096), (0x30A1, 0x30FA)],  # BIZUD
+    "kanji": [(0x4E00, 0x9FFF)],  # BIZUD
+}
+
+# scanlines per glyph, spread over the middle of its bounding box
+NUM_SCANLINES = 16
+SCAN_MARGIN = 0.2
+CURVE_STEPS = 8
+
+# codepoints measured per task
+CHUNK_SIZE = 1024
+
+
+class EdgePen(BasePen):
+    """Flattens an outline into line segments."""
+
+    def __init__(self, glyph_set: dict | None = None) -> None:
+        super().__init__(glyph_set)
+        self.edges: list[tuple[float, float, float, float]] = []
+        self._start: Point | None = None
+
+    def _line(self, pt: Point) -> None:
+        (x0, y0), (x1, y1) = self._getCurrentPoint(), pt
+        self.edges.append((x0, y0, x1, y1))
+
+    def _moveTo(self, pt: Point) -> None:
+        self._start = pt
+
+    def _lineTo(self, pt: Point) -> None:
+        self._line(pt)
+
+    def _curveToOne(self, p1: Point, p2: Point, p3: Point) -> None:
+        p0 = self._getCurrentPoint()
+        start = p0
+        for t in np.linspace(0, 1, CURVE_STEPS + 1)[1:]:
+            s = 1 - t
+            pt = tuple(
+                s**3 * a + 3 * s**2 * t * b + 3 * s * t**2 * c + t**3 * d
+                for a, b, c, d in zip(p0, p1, p2, p3)
+            )
+            self.edges.append((*start, *pt))
+            start = pt
+
+    def _closePath(self) -> None:
+        if self._start is not None and self._getCurrentPoint() != self._start:
+            self._line(self._start)
+
+    _endPath = _closePath
+
+
+def scan_crossings(edges: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """Sorted x of the crossings along horizontal scanlines at `positions`.
+
+    `edges` is (n, 4) as (x0, y0, x1, y1). Returns (scanlines, n), with the
+    edges that do not cross a scanline as trailing NaN.
+    """
+    x0, y0, x1, y1 = (edges[:, i][None, :] for i in range(4))
+    y = positions[:, None]
+    crossing = (y0 <= y) != (y1 <= y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        xs = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+    return np.sort(np.where(crossing, xs, np.nan), axis=1)
+
+
+def scan_runs(edges: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """Lengths of the filled runs along horizontal scanlines at `positions`.
+
+    Filled runs are taken between alternate crossings (even-odd), which
+    matches nonzero for strokes.
+    """
+    xs = scan_crossings(edges, positions)
+
+    if xs.shape[1] % 2:
+        xs = np.pad(xs, ((0, 0), (0, 1)), constant_values=np.nan)
+    runs = xs[:, 1::2] - xs[:, 0::2]
+    return runs[~np.isnan(runs)]
+
+
+@dataclass(frozen=True)
+class GlyphStems:
+    codepoint: int
+    vertical: float  # width of vertical stems, from horizontal scanlines
+    horizontal: float  # thickness of horizontal stems, from vertical scanlines
+
+
+def measure_glyph(edges: np.ndarray, codepoint: int) -> GlyphStems | None:
+    if len(edges) == 0:
+        return None
+
+    xmin, xmax = edges[:, [0, 2]].min(), edges[:, [0, 2]].max()
+    ymin, ymax = edges[:, [1, 3]].min(), edges[:, [1, 3]].max()
+
+    def median_run(edges: np.ndarray, low: float, high: float) -> float:
+        margin = (high - low) * SCAN_MARGIN
+        positions = np.linspace(low + margin, high - margin, NUM_SCANLINES)
+        runs = scan_runs(edges, positions)
+        return float(np.median(runs)) if len(runs) else float("nan")
+
+    return GlyphStems(
+        codepoint,
+        median_run(edges, ymin, ymax),
+        # swap x and y to scan vertically
+        median_run(edges[:, [1, 0, 3, 2]], xmin, xmax),
+    )
+
+
+def stem_at(
+    edges: np.ndarray, rel_position: float, width: float | None = None
+) -> float | None:
+    """Width of the outline along the line at `rel_position` of the glyph height
+    above the baseline, from its first to its last filled x within [0, `width`].
+
+    This is what intersecting the glyph with a band across its advance width
+    leaves, so gaps between strokes are included.
+    """
+    if len(edges) == 0:
+        return None
+
+    ymin, ymax = edges[:, [1, 3]].min(), edges[:, [1, 3]].max()
+    xs = scan_crossings(edges, np.array([(ymax - ymin) * rel_position]))[0]
+    xs = xs[~np.isnan(xs)]
+    if len(xs) < 2:
+        return None
+
+    left, right = xs[0], xs[-1]
+    if width is not None:
+        left, right = max(left, 0), min(right, width)
+    return float(right - left) if right > left else None
+
+
+def glyph_edges(glyph: Any, glyph_set: dict | None = None) -> np.ndarray:
+    """Edges of anything with a `draw(pen)`, a fontTools or fontforge glyph."""
+    pen = EdgePen(glyph_set)
+    glyph.draw(pen)
+    return np.array(pen.edges).reshape(-1, 4)
+
+
+def measure_glyphs(font_path: Path, codepoints: list[int]) -> list[GlyphStems]:
+    font = TTFont(str(font_path), lazy=True)
+    cmap = font.getBestCmap()
+    glyph_set = font.getGlyphSet()
+
+    stems = []
+    for codepoint in codepoints:
+        edges = glyph_edges(glyph_set[cmap[codepoint]], glyph_set)
+        glyph_stems = measure_glyph(edges, codepoint)
+        if glyph_stems is not None:
+            stems.append(glyph_stems)
+
+    font.close()
+    return stems
+
+
+@dataclass(frozen=True)
+class StemSummary:
+    script: str
+    glyphs: int
+    vertical: tuple[float, float, float]  # 25th, 50th and 75th percentiles
+    horizontal: tuple[float, float, float]
+
+
+def summarize(script: str, stems: list[GlyphStems]) -> StemSummary:
+    def percentiles(values: list[float]) -> tuple[float, float, float]:
+        values = [value for value in values if not np.isnan(value)]
+        if not values:
+            return (float("nan"),) * 3
+        p25, p50, p75 = np.percentile(values, [25, 50, 75])
+        return (float(p25), float(p50), float(p75))
+
+    return StemSummary(
+        script,
+        len(stems),
+        percentiles([glyph.vertical for glyph in stems]),
+        percentiles([glyph.horizontal for glyph in stems]),
+    )
+
+
+def analyze_font(
+    font_path: Path,
+    sample: int | None = None,
+    jobs: int | None = None,
+) -> list[StemSummary]:
+    """Stem width distributions per script, over at most `sample` glyphs each."""
+    cmap = TTFont(str(font_path), lazy=True).getBestCmap()
+
+    scripts = {}
+    for script, ranges in SCRIPTS.items():
+        codepoints = [
+            codepoint
+            for start, stop in ranges
+            for codepoint in range(start, stop + 1)
+            if codepoint in cmap
+        ]
+        if sample is not None and len(codepoints) > sample:
+            codepoints = codepoints[:: -(-len(codepoints) // sample)]
+        scripts[script] = codepoints
+
+    with ProcessPoolExecutor(jobs) as executor:
+        futures = {
+            script: [
+                executor.submit(
+                    measure_glyphs, font_path, codepoints[i : i + CHUNK_SIZE]
+                )
+                for i in range(0, len(codepoints), CHUNK_SIZE)
+            ]
+            for script, codepoints in scripts.items()
+        }
+        return [
+            summarize(script, [stem for future in chunks for stem in future.result()])
+            for script, chunks in futures.items()
+        ]
+
+
+def print_summaries(font_path: Path, summaries: list[StemSummary]) -> None:
+    print(font_path.name)
+    for summary in summaries:
+        vertical = "/".join(f"{value:.1f}" for value in summary.vertical)
+        horizontal = "/".join(f"{value:.1f}" for value in summary.horizontal)
+        print(
+            f"  {summary.script:6} {summary.glyphs:5} glyphs  "
+            + f"vertical {vertical}  horizontal {horizontal}"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Stem widths per script, as 25th/50th/75th percentiles.",
+        usage="python -m src.stem_weight dist/*.ttf --sample 500",
+    )
+    parser.add_argument("font_files", type=str, nargs="+", help="Paths to font.ttf.")
+    parser.add_argument(
+        "--sample",
+        type=int,
+        default=None,
+        help="Measure at most this many glyphs per script.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of processes. Defaults to the number of CPUs.",
+    )
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    for font_file in args.font_files:
+        font_path = Path(font_file)
+        print_summaries(font_path, analyze_font(font_path, args.sample, args.jobs))
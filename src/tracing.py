@@ -0,0 +1,138 @@
+import json
+import os
+import resource
+import time
+from contextlib import AbstractContextManager, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from .log import log
+
+
+@dataclass
+class Span:
+    name: str
+    pid: int
+    start: float  # seconds since the epoch
+    duration: float = 0
+    depth: int = 0
+    glyphs: int = 0
+    # outline operations: transforms, changeWeight, copy, paste and mergeFonts
+    calls: int = 0
+    # current RSS in KiB at entry and exit
+    rss_start: int = 0
+    rss_end: int = 0
+    # peak RSS of the process so far in KiB, at entry and exit; the stage peaked
+    # at maxrss_end if it rose, and at most at maxrss_start otherwise
+    maxrss_start: int = 0
+    maxrss_end: int = 0
+
+    @property
+    def peak_rise(self) -> int:
+        """How far the stage raised the peak RSS of the process, in KiB."""
+        return self.maxrss_end - self.maxrss_start
+
+    def rss_summary(self) -> str:
+        return (
+            f"RSS {self.rss_end / 1024:.0f} MiB "
+            + f"({(self.rss_end - self.rss_start) / 1024:+.0f}), "
+            + f"peak {self.maxrss_end / 1024:.0f} MiB "
+            + f"(+{self.peak_rise / 1024:.0f})"
+        )
+
+
+def current_rss() -> int:
+    """Resident set size of this process now, in KiB."""
+    with open("/proc/self/statm") as f:
+        resident = int(f.read().split()[1])
+    return resident * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def peak_rss() -> int:
+    """Peak resident set size of this process so far, in KiB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+        self._active: list[Span] = []
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Span]:
+        span = Span(name, os.getpid(), time.time(), depth=len(self._active))
+        self._active.append(span)
+        span.rss_start, span.maxrss_start = current_rss(), peak_rss()
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter() - start
+            span.rss_end, span.maxrss_end = current_rss(), peak_rss()
+            self._active.pop()
+            self.spans.append(span)
+
+    def count(self, glyphs: int = 0, calls: int = 0) -> None:
+        for span in self._active:
+            span.glyphs += glyphs
+            span.calls += calls
+
+    def to_chrome_trace(self) -> dict:
+        events = []
+        for span in self.spans:
+            events.append(
+                {
+                    "name": span.name,
+                    "ph": "X",
+                    "ts": span.start * 1e6,
+                    "dur": span.duration * 1e6,
+                    "pid": span.pid,
+                    "tid": span.pid,
+                    "args": {
+                        "glyphs": span.glyphs,
+                        "calls": span.calls,
+                        "rss_start_kib": span.rss_start,
+                        "rss_end_kib": span.rss_end,
+                        "maxrss_start_kib": span.maxrss_start,
+                        "maxrss_end_kib": span.maxrss_end,
+                    },
+                }
+            )
+            for ts, rss, maxrss in [
+                (span.start, span.rss_start, span.maxrss_start),
+                (span.start + span.duration, span.rss_end, span.maxrss_end),
+            ]:
+                events.append(
+                    {
+                        "name": "rss",
+                        "ph": "C",
+                        "ts": ts * 1e6,
+                        "pid": span.pid,
+                        "args": {"current KiB": rss, "peak KiB": maxrss},
+                    }
+                )
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, path: Path) -> None:
+        path.write_text(json.dumps(self.to_chrome_trace()))
+
+    def print_summary(self) -> None:
+        log("Profile")
+        for span in sorted(self.spans, key=lambda span: span.start):
+            log(
+                f"  {'  ' * span.depth}{span.name}: {span.duration:.2f}s, "
+                + f"{span.glyphs} glyphs, {span.calls} calls, {span.rss_summary()}"
+            )
+
+
+tracer = Tracer()
+
+
+def stage(name: str) -> AbstractContextManager[Span]:
+    return tracer.stage(name)
+
+
+def count(glyphs: int = 0, calls: int = 0) -> None:
+    tracer.count(glyphs, calls)
@@ -1,65 +1,118 @@
 import statistics
-from datetime import datetime
 from decimal import ROUND_HALF_UP, Decimal
-from typing import Any
+from typing import Any, Callable
 
+import fontforge
+import numpy as np
 import psMat
 from fontforge import font as Font
 from fontforge import glyph as Glyph
 from fontforge import glyphPen as GlyphPen
 
-
-def log(msg: str) -> None:
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"[{now}] {msg}")
+from .log import log  # noqa: F401
+from .tracing import count
 
 
 def round_half_up(f: float, e: str = "0") -> Decimal:
     return Decimal(str(f)).quantize(Decimal(e), ROUND_HALF_UP)
 
 
+def round_half_up_array(values: np.ndarray) -> np.ndarray:
+    """`round_half_up` to integers, vectorized.
+
+    The fraction is compared exactly, which agrees with the decimal string
+    path since no float below .5 has a shortest repr of .5.
+    """
+    magnitude = np.abs(values)
+    whole = np.floor(magnitude)
+    return np.sign(values) * (whole + (magnitude - whole >= 0.5))
+
+
 def calc_actual_size(glyph: Glyph) -> tuple[float, float]:
     left, bottom, right, top = glyph.boundingBox()
     return (right - left, top - bottom)
 
 
-def get_max_width(glyphs: list[Glyph]) -> float:
-    max_width = 0
-    for glyph in glyphs:
-        left, _, right, _ = glyph.boundingBox()
-        max_width = max(right - left, max_width)
+class BBoxIndex:
+    """Bounding boxes of `glyphs`, read once into a (glyphs, 4) array.
 
-    return max_width
+    Rows are (left, bottom, right, top) in the order of `glyphs`. Empty glyphs
+    keep (0, 0, 0, 0), as `boundingBox` reports them.
+    """
 
+    def __init__(self, glyphs: list[Glyph]) -> None:
+        self.glyphs = glyphs
+        self.boxes = np.array(
+            [glyph.boundingBox() for glyph in glyphs], dtype=np.float64
+        ).reshape(-1, 4)
+        self.empty = ~self.boxes.any(axis=1)
 
-def get_max_height(glyphs: list[Glyph]) -> float:
-    max_height = 0
-    for glyph in glyphs:
-        _, bottom, _, top = glyph.boundingBox()
-        max_height = max(top - bottom, max_height)
+    def box(self, i: int) -> tuple[float, ...]:
+        return tuple(self.boxes[i].tolist())
 
-    return max_height
+    def transform(self, matrix: tuple[float, ...]) -> "BBoxIndex":
+        """Follow a scale and translate applied to all the glyphs."""
+        xx, xy, yx, yy, dx, dy = matrix
+        if xx <= 0 or yy <= 0 or xy != 0 or yx != 0:
+            raise ValueError("Bounding box is lost after skew, rotation or flip")
 
+        boxes = self.boxes[~self.empty]
+        boxes[:, [0, 2]] = boxes[:, [0, 2]] * xx + dx
+        boxes[:, [1, 3]] = boxes[:, [1, 3]] * yy + dy
+        self.boxes[~self.empty] = boxes
+        return self
 
-def get_global_box(glyphs: list[Glyph]) -> tuple[int, ...]:
-    xmin, ymin, xmax, ymax = 0, 0, 0, 0
-    for glyph in glyphs:
-        left, bottom, right, top = glyph.boundingBox()
-        xmin = min(left, xmin)
-        ymin = min(bottom, ymin)
-        xmax = max(right, xmax)
-        ymax = max(top, ymax)
+    def max_width(self) -> float:
+        return float(np.max(self.boxes[:, 2] - self.boxes[:, 0], initial=0))
 
-    return xmin, ymin, xmax, ymax
+    def max_height(self) -> float:
+        return float(np.max(self.boxes[:, 3] - self.boxes[:, 1], initial=0))
+
+    def global_box(self) -> tuple[float, ...]:
+        # the origin is always included
+        return (
+            float(np.min(self.boxes[:, 0], initial=0)),
+            float(np.min(self.boxes[:, 1], initial=0)),
+            float(np.max(self.boxes[:, 2], initial=0)),
+            float(np.max(self.boxes[:, 3], initial=0)),
+        )
+
+    def mode_box(self) -> tuple[int, ...]:
+        if len(self.boxes) == 0:
+            raise statistics.StatisticsError("no mode for empty data")
+
+        modes = []
+        for column in round_half_up_array(self.boxes).T:
+            # like statistics.mode, ties go to the value seen first
+            values, first, counts = np.unique(
+                column, return_index=True, return_counts=True
+            )
+            modes.append(int(values[np.lexsort((first, -counts))[0]]))
+
+        return tuple(modes)
+
+
+def get_max_width(glyphs: list[Glyph]) -> float:
+    return BBoxIndex(glyphs).max_width()
+
+
+def get_max_height(glyphs: list[Glyph]) -> float:
+    return BBoxIndex(glyphs).max_height()
+
+
+def get_global_box(glyphs: list[Glyph]) -> tuple[float, ...]:
+    return BBoxIndex(glyphs).global_box()
 
 
 def get_mode_box(glyphs: list[Glyph]) -> tuple[int, ...]:
-    coords: list[tuple[int, ...]] = []
-    for glyph in glyphs:
-        coord = glyph.boundingBox()
-        coords.append(tuple([int(round_half_up(c)) for c in coord]))
+    return BBoxIndex(glyphs).mode_box()
 
-    return tuple(map(statistics.mode, [*zip(*coords)]))
+
+def has_glyphs(font: Font, unicodes: list[int]) -> bool:
+    """Whether glyphs are left at all of `unicodes`, after `remove_uncovered`."""
+    return all(
+        unicode in font and font[unicode].isWorthOutputting() for unicode in unicodes
+    )
 
 
 def remove_glyphs(font: Font, start: int, stop: int | None = None) -> None:
@@ -71,6 +124,114 @@ def remove_glyphs(font: Font, start: int, stop: int | None = None) -> None:
     font.selection.none()
 
 
+def glyph_unicodes(glyph: Glyph) -> list[int]:
+    """Codepoints mapped to `glyph`, its unicode then its plain `altuni` ones."""
+    unicodes = [glyph.unicode] if glyph.unicode >= 0 else []
+    for unicode, selector, _ in glyph.altuni or ():
+        if selector == -1:
+            unicodes.append(unicode)
+
+    return unicodes
+
+
+def remove_uncovered(font: Font, covers: Callable[[int], bool]) -> int:
+    """Remove the encoded glyphs none of whose codepoints is `covers`ed.
+
+    Kept glyphs drop their uncovered `altuni` codepoints, and take the first
+    covered one as unicode if theirs is not. Kept glyphs referring to removed
+    ones are unlinked first. Returns the number of removed glyphs.
+    """
+    removed = {}
+    for glyph in font.glyphs():
+        if glyph.unicode < 0:
+            continue
+
+        alternates = glyph.altuni or ()
+        kept = tuple(alternate for alternate in alternates if covers(alternate[0]))
+        plain = [alternate for alternate in kept if alternate[1] == -1]
+        if not covers(glyph.unicode) and not plain:
+            removed[glyph.glyphname] = glyph.unicode
+            continue
+
+        if not covers(glyph.unicode):
+            glyph.unicode = plain[0][0]
+            kept = tuple(alternate for alternate in kept if alternate != plain[0])
+        if len(kept) < len(alternates):
+            glyph.altuni = kept or None
+
+    for glyph in font.glyphs():
+        if glyph.glyphname in removed:
+            continue
+        for name, _ in glyph.references:
+            if name in removed:
+                glyph.unlinkRef(name)
+
+    # clear contiguous runs with one selection each
+    runs: list[list[int]] = []
+    for unicode in sorted(removed.values()):
+        if runs and runs[-1][-1] + 1 == unicode:
+            runs[-1].append(unicode)
+        else:
+            runs.append([unicode])
+    for run in runs:
+        remove_glyphs(font, run[0], run[-1])
+
+    return len(removed)
+
+
+def copy_glyphs(
+    src_font: Font,
+    dst_font: Font,
+    mapping: dict[int, int],
+    replace: bool = False,
+) -> None:
+    """Copy the glyphs of `src_font` into `dst_font` as {src: dst} in bulk.
+
+    With `replace`, destination glyphs take over the source outlines and
+    advance widths. Otherwise the outlines are pasted into the destination
+    glyphs, which keep their widths.
+    """
+    # fontforge copies and pastes selections in encoding order, so glyphs can
+    # share one clipboard round trip as long as their destinations keep the
+    # same order
+    pairs = sorted((src, dst) for src, dst in mapping.items() if src in src_font)
+    runs: list[list[tuple[int, int]]] = []
+    for src, dst in pairs:
+        if runs and runs[-1][-1][1] < dst:
+            runs[-1].append((src, dst))
+        else:
+            runs.append([(src, dst)])
+
+    for run in runs:
+        src_unicodes, dst_unicodes = zip(*run)
+
+        src_font.selection.select(*src_unicodes)
+        src_font.copy()
+        src_font.selection.none()
+
+        dst_font.selection.select(*dst_unicodes)
+        if replace:
+            dst_font.paste()
+        else:
+            dst_font.pasteInto()
+        dst_font.selection.none()
+        count(calls=2)
+
+
+def copy_glyph_range(
+    src: tuple[Font, tuple[int, int]],
+    dst: tuple[Font, int],
+    replace: bool = False,
+) -> None:
+    src_font, (start, stop) = src
+    dst_font, dst_start = dst
+
+    mapping = {
+        unicode: dst_start + unicode - start for unicode in range(start, stop + 1)
+    }
+    copy_glyphs(src_font, dst_font, mapping, replace)
+
+
 def copy_glyph(
     src: tuple[Font, int],
     dst: tuple[Font, int],
@@ -79,25 +240,121 @@ def copy_glyph(
     src_font, src_unicode = src
     dst_font, dst_unicode = dst
 
-    src_font.selection.select(src_unicode)
-    src_font.copy()
-    src_font.selection.none()
-
-    dst_font.selection.select(dst_unicode)
-    if replace:
-        dst_font.paste()
-    else:
-        dst_font.pasteInto()
-    dst_font.selection.none()
+    copy_glyphs(src_font, dst_font, {src_unicode: dst_unicode}, replace)
+
+
+class TransformPlan:
+    """Affine transforms of a glyph, composed and applied in a single pass.
+
+    The plan tracks the advance width and bounding box the glyph would have
+    after each step, so that the steps behave as if applied one at a time.
+    """
+
+    def __init__(self, glyph: Glyph, box: tuple[float, ...] | None = None) -> None:
+        self.glyph = glyph
+        self.matrix = psMat.identity()
+        self.width = glyph.width
+        self._source_box = box  # known bounding box of the untransformed glyph
+        self._box: tuple[float, ...] | None = None
+        self._axis_aligned = True
+
+    def transform(self, matrix: tuple[float, ...]) -> "TransformPlan":
+        self.matrix = psMat.compose(self.matrix, matrix)
+
+        xx, xy, yx, yy, dx, dy = matrix
+        if xx > 0 and yy > 0 and xy == 0 and yx == 0:
+            # fontforge moves the advance width along, and stores it as an int
+            self.width = int(self.width * xx + dx)
+            if self._box is not None and any(self._box):
+                left, bottom, right, top = self._box
+                self._box = (
+                    left * xx + dx,
+                    bottom * yy + dy,
+                    right * xx + dx,
+                    top * yy + dy,
+                )
+        else:
+            self._axis_aligned = False
+
+        return self
+
+    def translate(self, x: float, y: float = 0) -> "TransformPlan":
+        return self.transform(psMat.translate((x, y)))
+
+    def scale(self, scale: float) -> "TransformPlan":
+        return self.transform(psMat.scale(scale))
+
+    def skew(self, skew: float) -> "TransformPlan":
+        return self.transform(psMat.skew(skew))
+
+    def set_width(self, width: int) -> "TransformPlan":
+        self.width = width
+        return self
+
+    def bounding_box(self) -> tuple[float, ...]:
+        if not self._axis_aligned:
+            raise ValueError("Bounding box is lost after skew or rotation")
+
+        if self._box is None:
+            # an empty glyph keeps (0, 0, 0, 0) whatever it is transformed by
+            if self._source_box is None:
+                self._source_box = self.glyph.boundingBox()
+            self._box = self._source_box
+            if any(self._box):
+                xx, _, _, yy, dx, dy = self.matrix
+                left, bottom, right, top = self._box
+                self._box = (
+                    left * xx + dx,
+                    bottom * yy + dy,
+                    right * xx + dx,
+                    top * yy + dy,
+                )
+
+        return self._box
+
+    def align_center(self) -> "TransformPlan":
+        width = self.width
+        left, _, right, _ = self.bounding_box()
+        left_margin = left
+        right_margin = width - right
+        self.translate((right_margin - left_margin) / 2)
+        return self.set_width(width)
+
+    def resize_width(
+        self,
+        width: int,
+        rescale_glyph: bool = True,
+        retain_position: bool = True,
+    ) -> "TransformPlan":
+        if rescale_glyph:
+            self.scale(width / self.width)
+
+        if retain_position:
+            self.translate((width - self.width) / 2)
+
+        return self.set_width(width)
+
+    def fit(self, width: int, ascent: int, descent: int) -> "TransformPlan":
+        # fit to shortest one
+        scale = min(
+            width / self.width,
+            ascent / self.glyph.font.ascent,
+            descent / self.glyph.font.descent,
+        )
+        self.scale(scale)
+
+        # shift to original position
+        return self.resize_width(width, rescale_glyph=False)
+
+    def apply(self) -> None:
+        if self.matrix != psMat.identity():
+            self.glyph.transform(self.matrix)
+            count(calls=1)
+        self.glyph.width = self.width
 
 
 def align_center(glyph: Glyph) -> None:
-    width = glyph.width
-    left, _, right, _ = glyph.boundingBox()
-    left_margin = left
-    right_margin = width - right
-    glyph.transform(psMat.translate((right_margin - left_margin) / 2))
-    glyph.width = width
+    TransformPlan(glyph).align_center().apply()
 
 
 def resize_width(
@@ -106,26 +363,51 @@ def resize_width(
     rescale_glyph: bool = True,
     retain_position: bool = True,
 ) -> None:
-    if rescale_glyph:
-        glyph.transform(psMat.scale(width / glyph.width))
+    TransformPlan(glyph).resize_width(width, rescale_glyph, retain_position).apply()
 
-    if retain_position:
-        glyph.transform(psMat.translate((width - glyph.width) / 2))
 
-    glyph.width = width
+def fit(glyph: Glyph, width: int, ascent: int, descent: int) -> None:
+    TransformPlan(glyph).fit(width, ascent, descent).apply()
 
 
-def fit(glyph: Glyph, width: int, ascent: int, descent: int) -> None:
-    # fit to shortest one
-    scale = min(
-        width / glyph.width,
-        ascent / glyph.font.ascent,
-        descent / glyph.font.descent,
-    )
-    glyph.transform(psMat.scale(scale))
+Outline = list[tuple[bool, bool, list[tuple[float, float, bool, int]]]]
+
+
+def dump_outline(glyph: Glyph) -> Outline:
+    """Foreground contours of `glyph` as plain tuples to pass between processes."""
+    return [
+        (
+            contour.closed,
+            contour.is_quadratic,
+            [(point.x, point.y, point.on_curve, point.type) for point in contour],
+        )
+        for contour in glyph.foreground
+    ]
+
+
+def load_outline(glyph: Glyph, outline: Outline) -> None:
+    layer = fontforge.layer()
+    layer.is_quadratic = glyph.foreground.is_quadratic
+    for closed, is_quadratic, points in outline:
+        contour = fontforge.contour()
+        contour.is_quadratic = is_quadratic
+        for x, y, on_curve, point_type in points:
+            contour += fontforge.point(x, y, on_curve, point_type)
+        contour.closed = closed
+        layer += contour
+
+    glyph.foreground = layer
+
+
+def italicize(font: Font, skew: float) -> int:
+    n = 0
+    for glyph in font.glyphs():
+        if glyph.isWorthOutputting:
+            glyph.transform(psMat.skew(skew))
+            n += 1
 
-    # shift to original position
-    resize_width(glyph, width, rescale_glyph=False)
+    count(calls=n)
+    return n
 
 
 def draw_square(
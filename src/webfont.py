@@ -0,0 +1,127 @@
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from fontTools.subset import Options, Subsetter, save_font
+from fontTools.ttLib import TTFont
+
+from .manifest import hash_file
+
+# (name, [start, stop] ranges), a codepoint goes to the first block covering it
+BLOCKS: list[tuple[str, list[tuple[int, int]]]] = [
+    ("latin", [(0x0000, 0x024F), (0x2000, 0x206F), (0x20A0, 0x20CF)]),
+    ("symbols", [(0x0250, 0x1FFF), (0x2070, 0x2E7F)]),
+    ("kana", [(0x3000, 0x30FF), (0x31F0, 0x31FF), (0xFF00, 0xFFEF)]),
+    (
+        "cjk",
+        [
+            (0x2E80, 0x2FFF),
+            (0x3100, 0x31EF),
+            (0x3200, 0x9FFF),
+            (0xF900, 0xFAFF),
+            (0x20000, 0x3FFFF),
+        ],
+    ),
+    ("nerd", [(0xE000, 0xF8FF), (0xF0000, 0x10FFFF)]),
+]
+
+# big blocks are split so that a page only fetches the chunks it shows
+CHUNK_SIZE = 1024
+
+
+@dataclass(frozen=True)
+class Subset:
+    name: str
+    unicodes: tuple[int, ...]
+
+    @property
+    def unicode_range(self) -> str:
+        """CSS unicode-range of the codepoints, merging consecutive ones."""
+        ranges: list[list[int]] = []
+        for unicode in self.unicodes:
+            if ranges and ranges[-1][1] + 1 == unicode:
+                ranges[-1][1] = unicode
+            else:
+                ranges.append([unicode, unicode])
+
+        return ", ".join(
+            f"U+{start:X}" if start == stop else f"U+{start:X}-{stop:X}"
+            for start, stop in ranges
+        )
+
+
+def plan_subsets(unicodes: list[int], chunk_size: int = CHUNK_SIZE) -> list[Subset]:
+    blocks: dict[str, list[int]] = {name: [] for name, _ in BLOCKS}
+    blocks["other"] = []
+    for unicode in sorted(set(unicodes)):
+        name = next(
+            (
+                name
+                for name, ranges in BLOCKS
+                if any(start <= unicode <= stop for start, stop in ranges)
+            ),
+            "other",
+        )
+        blocks[name].append(unicode)
+
+    subsets = []
+    for name, block in blocks.items():
+        chunks = [block[i : i + chunk_size] for i in range(0, len(block), chunk_size)]
+        for i, chunk in enumerate(chunks):
+            subset_name = name if len(chunks) == 1 else f"{name}-{i:02}"
+            subsets.append(Subset(subset_name, tuple(chunk)))
+
+    return subsets
+
+
+def build_subset(font_path: Path, subset: Subset, output_path: Path) -> None:
+    options = Options()
+    options.flavor = "woff2"
+    options.layout_features = ["*"]
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+    options.hinting = False
+
+    font = TTFont(str(font_path))
+    subsetter = Subsetter(options)
+    subsetter.populate(unicodes=subset.unicodes)
+    subsetter.subset(font)
+
+    tmp_path = output_path.with_name(f"{output_path.name}.tmp")
+    save_font(font, str(tmp_path), options)
+    tmp_path.replace(output_path)
+
+
+def export_webfonts(
+    font_path: Path,
+    unicodes: list[int],
+    webfont_dir: Path,
+    jobs: int | None = None,
+) -> list[tuple[Path, Subset]]:
+    """WOFF2 subsets of `font_path` in `webfont_dir`, built in `jobs` processes.
+
+    Subsets live in a directory named after the font hash, so they are only
+    rebuilt when the font changed. Directories of older builds of the same
+    font are removed.
+    """
+    font_dir = webfont_dir / f"{font_path.stem}-{hash_file(font_path)[:16]}"
+    for old_dir in webfont_dir.glob(f"{font_path.stem}-*"):
+        if old_dir != font_dir and old_dir.is_dir():
+            shutil.rmtree(old_dir)
+    font_dir.mkdir(parents=True, exist_ok=True)
+
+    subsets = plan_subsets(unicodes)
+    paths = [font_dir / f"{subset.name}.woff2" for subset in subsets]
+    missing = [
+        (subset, path) for subset, path in zip(subsets, paths) if not path.exists()
+    ]
+    if missing:
+        with ProcessPoolExecutor(jobs) as executor:
+            for future in [
+                executor.submit(build_subset, font_path, subset, path)
+                for subset, path in missing
+            ]:
+                future.result()
+
+    return list(zip(paths, subsets))
@@ -0,0 +1,51 @@
+import statistics
+import unittest
+
+import numpy as np
+
+from src.utils import BBoxIndex, round_half_up, round_half_up_array
+
+
+class FakeGlyph:
+    def __init__(self, box: tuple[float, ...]) -> None:
+        self.box = box
+
+    def boundingBox(self) -> tuple[float, ...]:
+        return self.box
+
+
+class TestBBoxIndex(unittest.TestCase):
+    """test bounding box index"""
+
+    def test_round_half_up(self) -> None:
+        """same as the Decimal path"""
+        values = [0.5, 1.5, 2.5, -0.5, -2.5, 0.49999999999999994, 2.4999999999999996]
+        values += [-1.2, 3.7, 1e-9, -1e-9, 0.0, 123.45, 98.5000001]
+        expected = [int(round_half_up(value)) for value in values]
+        actual = round_half_up_array(np.array(values)).astype(int).tolist()
+        self.assertEqual(actual, expected)
+
+    def test_queries(self) -> None:
+        """same answers as statistics.mode and a plain scan"""
+        boxes: list[tuple[float, float, float, float]] = [
+            (10, -20.5, 90, 700),
+            (0, 0, 0, 0),
+            (12, -19.5, 88, 760),
+        ]
+        boxes += [(10.4, -20.4, 90, 690)]
+        index = BBoxIndex([FakeGlyph(box) for box in boxes])
+
+        rounded = [[int(round_half_up(c)) for c in box] for box in boxes]
+        expected = tuple(map(statistics.mode, zip(*rounded)))
+        self.assertEqual(index.mode_box(), expected)
+        self.assertEqual(index.max_width(), 80)
+        self.assertEqual(index.max_height(), 779.5)
+        self.assertEqual(index.global_box(), (0, -20.5, 90, 760))
+
+        index.transform((2, 0, 0, 2, 5, -5))
+        self.assertEqual(index.box(0), (25, -46, 185, 1395))
+        self.assertEqual(index.box(1), (0, 0, 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import threading
+import time
+import unittest
+
+from src.build_all import MemoryBudget
+
+
+class TestMemoryBudget(unittest.TestCase):
+    """test admitting jobs by their estimated peak RSS"""
+
+    def run_jobs(self, budget: MemoryBudget, amounts: list[int]) -> list[str]:
+        """Start jobs of `amounts` in order, each holding its reservation a while."""
+        events: list[str] = []
+        lock = threading.Lock()
+
+        def job(i: int) -> None:
+            with budget.reserve(amounts[i]):
+                with lock:
+                    events.append(f"start {i}")
+                time.sleep(0.1)
+                with lock:
+                    events.append(f"end {i}")
+
+        threads = []
+        for i in range(len(amounts)):
+            threads.append(threading.Thread(target=job, args=(i,)))
+            threads[-1].start()
+            time.sleep(0.02)  # reserve in order
+        for thread in threads:
+            thread.join()
+        return events
+
+    def test_within_budget(self) -> None:
+        """jobs fitting together run at once"""
+        events = self.run_jobs(MemoryBudget(100), [40, 60])
+        self.assertEqual(events[:2], ["start 0", "start 1"])
+
+    def test_over_budget(self) -> None:
+        """a job over the remaining budget waits for the running one"""
+        budget = MemoryBudget(100)
+        events = self.run_jobs(budget, [60, 60])
+        self.assertEqual(events, ["start 0", "end 0", "start 1", "end 1"])
+        self.assertEqual(budget.used, 0)
+
+    def test_larger_than_budget(self) -> None:
+        """a job larger than the budget runs, alone"""
+        events = self.run_jobs(MemoryBudget(100), [200, 10])
+        self.assertEqual(events, ["start 0", "end 0", "start 1", "end 1"])
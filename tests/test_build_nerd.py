@@ -0,0 +1,83 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import fontforge
+
+from src.build_nerd import prune_shaped, reshape_nerd, shaped_path
+from src.parameter import GlyphShape
+from src.utils import create_font, draw_square
+
+DEVICONS = 0xE700  # fitted to max_width, centered, on the baseline
+POWERLINE = 0xE0B0  # fitted to max_height, left aligned, on the ascent
+
+
+class TestBuildNerd(unittest.TestCase):
+    """test refitting a built Nerd Font to other cells"""
+
+    def test_reshape_nerd(self) -> None:
+        """icons are refitted and centered in a 648 cell"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            nerd_path = Path(tmp_dir) / "NerdFont.ttf"
+            nerd = create_font(encoding="UnicodeFull", ascent=864, descent=216)
+            # as build_nerd leaves them with the default --width 864
+            icon = nerd.createChar(DEVICONS)
+            draw_square(icon.glyphPen(), (132, 0), 600, 600)
+            icon.width = 864
+            arrow = nerd.createChar(POWERLINE)
+            draw_square(arrow.glyphPen(), (0, -216), 500, 1080)
+            arrow.width = 864
+            nerd.generate(str(nerd_path))
+            nerd.close()
+
+            output_path = Path(tmp_dir) / "NerdFont-23.ttf"
+            shape_to = GlyphShape(
+                ascent=864, descent=216, half_width=648, full_width=972
+            )
+            reshape_nerd(nerd_path, shape_to, output_path)
+
+            nerd = fontforge.open(str(output_path))
+            icon = nerd[DEVICONS]
+            left, bottom, right, top = icon.boundingBox()
+            self.assertEqual(icon.width, 648)
+            self.assertAlmostEqual((left + right) / 2, 324, delta=1)
+            self.assertAlmostEqual(right - left, 600 * 648 / 864, delta=1)
+            self.assertAlmostEqual(bottom, 0, delta=1)
+
+            arrow = nerd[POWERLINE]
+            left, bottom, right, top = arrow.boundingBox()
+            self.assertEqual(arrow.width, 648)
+            self.assertEqual((left, bottom, top), (0, -216, 864))
+            nerd.close()
+
+    def test_prune_shaped(self) -> None:
+        """outputs of an older font are removed, other shapes are kept"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            nerd_path = Path(tmp_dir) / "NerdFont.ttf"
+            nerd_path.write_bytes(b"font")
+            shapes = [
+                GlyphShape(ascent=864, descent=216, half_width=width, full_width=972)
+                for width in [540, 648]
+            ]
+            paths = [shaped_path(nerd_path, shape) for shape in shapes]
+            stale = nerd_path.with_name(f"NerdFont-{'0' * 12}-{'1' * 12}.ttf")
+            other = nerd_path.with_name(f"NerdFont-Mono-{'0' * 12}.ttf")
+            for path in [*paths, stale, other]:
+                path.write_bytes(b"")
+
+            prune_shaped(nerd_path, paths[1])
+            self.assertNotEqual(paths[0], paths[1])
+            self.assertEqual(
+                sorted(Path(tmp_dir).iterdir()), sorted([nerd_path, *paths, other])
+            )
+
+            # the font changed
+            nerd_path.write_bytes(b"new font")
+            prune_shaped(nerd_path, shaped_path(nerd_path, shapes[0]))
+            self.assertEqual(
+                sorted(Path(tmp_dir).iterdir()), sorted([nerd_path, other])
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import json
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src import build_server
+from src.build_server import BuildOptions, BuildService
+from src.parameter import Parameter
+
+PARAMETER_FILES = sorted(Path("./parameters").glob("Pennywort-*.json"))
+
+
+def load_parameter(path: Path) -> Parameter:
+    with open(path) as f:
+        return Parameter.from_dict(json.load(f))
+
+
+def fake_build_font(
+    parameter: Parameter, options: BuildOptions, output_path: Path
+) -> None:
+    """Write the style name, logging the start and end times next to it."""
+    start = time.time()
+    time.sleep(0.2)
+    output_path.write_text(parameter.style_name)
+    with open(output_path.parent / "builds.log", "a") as f:
+        f.write(f"{start} {time.time()}\n")
+
+
+class TestBuildService(unittest.TestCase):
+    """test the build server outputs, sharing and queueing"""
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self.tmp_dir.name)
+        self.options = BuildOptions(Path("./tmp"), "1.000", None, None, None, 0)
+        # the builder is forked with the patched function
+        patcher = mock.patch.object(build_server, "build_font", fake_build_font)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def builds(self) -> list[tuple[float, float]]:
+        lines = (self.output_dir / "builds.log").read_text().splitlines()
+        return [(float(s), float(e)) for s, e in (line.split() for line in lines)]
+
+    def build_concurrently(
+        self, service: BuildService, parameters: list[Parameter]
+    ) -> list[tuple[bytes, bool]]:
+        results: list[tuple[bytes, bool]] = [(b"", False)] * len(parameters)
+
+        def build(i: int) -> None:
+            results[i] = service.build(parameters[i])
+
+        threads = [
+            threading.Thread(target=build, args=(i,)) for i in range(len(parameters))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_cleanup(self) -> None:
+        """only outputs named by the service are removed at start"""
+        (self.output_dir / f"{'0' * 32}.ttf").write_text("")
+        (self.output_dir / "Pennywort-Regular.ttf").write_text("")
+        service = BuildService(self.options, self.output_dir)
+        service.close()
+
+        self.assertEqual(
+            [p.name for p in self.output_dir.iterdir()], ["Pennywort-Regular.ttf"]
+        )
+
+    def test_eviction(self) -> None:
+        """the least recently requested output is evicted and removed"""
+        first, second, third = [load_parameter(p) for p in PARAMETER_FILES[:3]]
+        service = BuildService(self.options, self.output_dir, max_entries=2)
+        try:
+            self.assertFalse(service.build(first)[1])
+            self.assertFalse(service.build(second)[1])
+            self.assertTrue(service.build(first)[1])
+            self.assertFalse(service.build(third)[1])
+
+            self.assertTrue(service.build(first)[1])
+            self.assertEqual(len(list(self.output_dir.glob("*.ttf"))), 2)
+            self.assertFalse(service.build(second)[1])
+        finally:
+            service.close()
+
+    def test_shared_build(self) -> None:
+        """concurrent requests for the same parameter wait for one build"""
+        parameter = load_parameter(PARAMETER_FILES[0])
+        service = BuildService(self.options, self.output_dir, jobs=2)
+        try:
+            results = self.build_concurrently(service, [parameter] * 3)
+        finally:
+            service.close()
+
+        self.assertEqual(len(self.builds()), 1)
+        self.assertEqual(sorted(hit for _, hit in results), [False, True, True])
+        self.assertEqual({data for data, _ in results}, {parameter.style_name.encode()})
+
+    def test_jobs(self) -> None:
+        """at most `jobs` builds run at once"""
+        parameters = [load_parameter(p) for p in PARAMETER_FILES[:4]]
+        service = BuildService(self.options, self.output_dir, jobs=2)
+        try:
+            results = self.build_concurrently(service, parameters)
+        finally:
+            service.close()
+
+        self.assertEqual([hit for _, hit in results], [False] * 4)
+        builds = self.builds()
+        self.assertEqual(len(builds), 4)
+        overlap = max(
+            sum(start <= moment < end for start, end in builds) for moment, _ in builds
+        )
+        self.assertLessEqual(overlap, 2)
@@ -0,0 +1,34 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.calibrate import bisect, write_values
+
+
+class TestCalibrate(unittest.TestCase):
+    """test calibration search and parameter rewriting"""
+
+    def test_bisect(self) -> None:
+        """meets the target within the tolerance, or clamps to the range"""
+        self.assertAlmostEqual(bisect(lambda x: 2 * x, 25, 0, 60), 12.5, delta=0.5)
+        self.assertEqual(bisect(lambda x: 2 * x, -10, 0, 60), 0)
+        self.assertEqual(bisect(lambda x: 2 * x, 200, 0, 60), 60)
+
+    def test_write_values(self) -> None:
+        """only the exact keys are replaced, the formatting is kept"""
+        text = (
+            '{\n  "weight_name": "Bold",\n  "os2_weight": 700,\n'
+            + '  "bizud": {\n    "baseline_shift": 0,\n    "weight": 12\n  }\n}\n'
+        )
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "parameter.json"
+            path.write_text(text)
+            write_values(path, {"baseline_shift": -98, "weight": 20})
+
+            expected = text.replace('"baseline_shift": 0', '"baseline_shift": -98')
+            expected = expected.replace('"weight": 12', '"weight": 20')
+            self.assertEqual(path.read_text(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
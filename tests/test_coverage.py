@@ -0,0 +1,70 @@
+import unittest
+
+from src.parameter import Coverage
+from src.utils import create_font, draw_square, glyph_unicodes, remove_uncovered
+
+
+class TestCoverage(unittest.TestCase):
+    """test coverage profiles"""
+
+    def test_covers(self) -> None:
+        """include, then exclude"""
+        everything = Coverage()
+        self.assertTrue(everything.covers(0xF0001))
+
+        no_mdi = Coverage.from_dict({"exclude": [[0xF0001, 0xF1AF0]]})
+        self.assertTrue(no_mdi.covers(ord("a")))
+        self.assertFalse(no_mdi.covers(0xF0001))
+        self.assertFalse(no_mdi.covers(0xF1AF0))
+        self.assertTrue(no_mdi.covers(0xF1AF1))
+
+        bmp = Coverage.from_dict(
+            {"include": [[0x0000, 0xFFFF]], "exclude": [[0xE000, 0xF8FF]]}
+        )
+        self.assertTrue(bmp.covers(ord("漢")))
+        self.assertFalse(bmp.covers(0xE0B0))
+        self.assertFalse(bmp.covers(0x20000))
+
+    def test_overlapping_ranges(self) -> None:
+        """unsorted and overlapping ranges are merged before the lookup"""
+        coverage = Coverage.from_dict(
+            {
+                "include": [[0x3000, 0x30FF], [0x20, 0x7E], [0x3040, 0x3200]],
+                "exclude": [[0x30A0, 0x30A5], [0x30A0, 0x30FF]],
+            }
+        )
+        self.assertTrue(coverage.covers(0x20))
+        self.assertFalse(coverage.covers(0x7F))
+        self.assertTrue(coverage.covers(0x3042))
+        self.assertFalse(coverage.covers(0x30A8))
+        self.assertTrue(coverage.covers(0x3100))
+        self.assertFalse(coverage.covers(0x3201))
+
+    def test_from_codepoints(self) -> None:
+        """exactly the codepoints, as merged ranges"""
+        coverage = Coverage.from_codepoints([0x61, 0x62, 0x63, 0x3042, 0x61])
+        self.assertEqual(coverage.include, [(0x61, 0x63), (0x3042, 0x3042)])
+        self.assertTrue(coverage.covers(0x62))
+        self.assertTrue(coverage.covers(0x3042))
+        self.assertFalse(coverage.covers(0x64))
+
+    def test_remove_uncovered(self) -> None:
+        """glyphs are kept if any of their codepoints is covered"""
+        font = create_font(encoding="UnicodeFull")
+        for unicode, alternate in [(0x41, 0x391), (0x42, 0x392), (0x43, 0x393)]:
+            glyph = font.createChar(unicode)
+            draw_square(glyph.glyphPen(), (100, 0), 400, 700)
+            glyph.altuni = ((alternate, -1, 0),)
+
+        covered = {0x41, 0x392}
+        self.assertEqual(remove_uncovered(font, lambda u: u in covered), 1)
+
+        # A drops Alpha, B is kept as Beta only, C and Gamma are removed
+        self.assertEqual(glyph_unicodes(font["A"]), [0x41])
+        self.assertEqual(glyph_unicodes(font["B"]), [0x392])
+        self.assertFalse(font["C"].isWorthOutputting())
+        font.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from fontTools.fontBuilder import FontBuilder
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+
+from src.diff_fonts import diff_fonts, format_ranges, hash_glyphs
+
+Box = tuple[int, int, int, int]  # (left, bottom, right, top)
+
+
+def save_font(path: Path, glyphs: dict[int, tuple[Box | str, int]]) -> None:
+    """A font of boxes, or references to earlier glyphs, with their widths."""
+    names = {codepoint: f"uni{codepoint:04X}" for codepoint in glyphs}
+    outlines = {".notdef": TTGlyphPen(None).glyph()}
+    metrics = {".notdef": (500, 0)}
+    for codepoint, (shape, width) in glyphs.items():
+        pen = TTGlyphPen(outlines)
+        if isinstance(shape, str):
+            pen.addComponent(shape, (1, 0, 0, 1, 0, 0))
+            metrics[names[codepoint]] = (width, metrics[shape][1])
+        else:
+            left, bottom, right, top = shape
+            pen.moveTo((left, bottom))
+            pen.lineTo((left, top))
+            pen.lineTo((right, top))
+            pen.lineTo((right, bottom))
+            pen.closePath()
+            metrics[names[codepoint]] = (width, left)
+        outlines[names[codepoint]] = pen.glyph()
+
+    builder = FontBuilder(1000, isTTF=True)
+    builder.setupGlyphOrder(list(outlines))
+    builder.setupCharacterMap(names)
+    builder.setupGlyf(outlines)
+    builder.setupHorizontalMetrics(metrics)
+    builder.setupHorizontalHeader(ascent=880, descent=-120)
+    builder.setupNameTable({"familyName": "Test", "styleName": "Regular"})
+    builder.setupOS2(sTypoAscender=880, sTypoDescender=-120)
+    builder.setupPost()
+    builder.save(str(path))
+
+
+class TestDiffFonts(unittest.TestCase):
+    """test glyph-level font diffs"""
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.old_path = Path(self.tmp_dir.name) / "old.ttf"
+        self.new_path = Path(self.tmp_dir.name) / "new.ttf"
+        self.glyphs: dict[int, tuple[Box | str, int]] = {
+            0x41: ((100, 0, 400, 700), 500),
+            0x42: ((100, 0, 400, 700), 500),
+            0x43: ((50, 0, 450, 700), 500),
+        }
+        save_font(self.old_path, self.glyphs)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_identical(self) -> None:
+        """the same glyphs report nothing"""
+        save_font(self.new_path, self.glyphs)
+        diff = diff_fonts(self.old_path, self.new_path, jobs=1)
+        self.assertEqual((diff.added, diff.removed, diff.changed), ([], [], []))
+
+    def test_changes(self) -> None:
+        """added, removed and changed codepoints are each reported"""
+        glyphs = dict(self.glyphs)
+        glyphs[0x42] = ((100, 0, 420, 700), 520)
+        del glyphs[0x43]
+        glyphs[0x44] = ((100, 0, 400, 700), 500)
+        save_font(self.new_path, glyphs)
+
+        diff = diff_fonts(self.old_path, self.new_path, jobs=1)
+        self.assertEqual(diff.added, [0x44])
+        self.assertEqual(diff.removed, [0x43])
+        self.assertEqual([change.codepoint for change in diff.changed], [0x42])
+        change = diff.changed[0]
+        self.assertTrue(change.outline_changed)
+        self.assertEqual(change.width_delta, 20)
+        self.assertEqual(change.bbox_delta, (0, 0, 20, 0))
+
+    def test_width_only(self) -> None:
+        """a changed advance width keeps the outline hash"""
+        glyphs = dict(self.glyphs)
+        glyphs[0x41] = ((100, 0, 400, 700), 600)
+        save_font(self.new_path, glyphs)
+
+        (change,) = diff_fonts(self.old_path, self.new_path, jobs=1).changed
+        self.assertEqual(change.codepoint, 0x41)
+        self.assertFalse(change.outline_changed)
+        self.assertEqual(change.width_delta, 100)
+        self.assertEqual(change.bbox_delta, (0, 0, 0, 0))
+
+    def test_hash_composite(self) -> None:
+        """a reference hashes the same as the outline it draws"""
+        glyphs = dict(self.glyphs)
+        glyphs[0x42] = ("uni0041", 500)
+        save_font(self.new_path, glyphs)
+
+        old_keys = hash_glyphs(self.old_path, [0x41, 0x42, 0x43])
+        new_keys = hash_glyphs(self.new_path, [0x41, 0x42, 0x43])
+        self.assertEqual(new_keys, old_keys)
+        self.assertEqual(old_keys[0x41], old_keys[0x42])
+        self.assertNotEqual(old_keys[0x41], old_keys[0x43])
+        self.assertEqual(old_keys[0x43][1:], (500, (50, 0, 450, 700)))
+
+    def test_format_ranges(self) -> None:
+        """consecutive codepoints are joined"""
+        self.assertEqual(format_ranges([]), "")
+        self.assertEqual(format_ranges([0x41]), "0x41")
+        self.assertEqual(
+            format_ranges([0x41, 0x42, 0x43, 0x45, 0x3042, 0x3043]),
+            "0x41~0x43, 0x45, 0x3042~0x3043",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
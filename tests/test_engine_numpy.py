@@ -0,0 +1,78 @@
+import copy
+import math
+import unittest
+
+from fontTools.fontBuilder import FontBuilder
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from fontTools.ttLib import TTFont
+
+from src import engine_fonttools, engine_numpy
+from src.parameter import GlyphShape
+
+SHAPE_AS = GlyphShape(ascent=880, descent=120, half_width=500, full_width=1000)
+SHAPE_TO = GlyphShape(ascent=864, descent=216, half_width=540, full_width=1080)
+
+
+def create_test_font() -> TTFont:
+    """Half width, full width and empty glyphs."""
+    widths = {".notdef": 0, "half": 500, "full": 1000, "space": 500, "odd": 333}
+    glyphs = {}
+    for name, width in widths.items():
+        pen = TTGlyphPen(None)
+        if width and name != "space":
+            pen.moveTo((50, -50))
+            pen.lineTo((50, 750))
+            pen.lineTo((width - 100, 750))
+            pen.lineTo((width - 100, -50))
+            pen.closePath()
+        glyphs[name] = pen.glyph()
+
+    builder = FontBuilder(1000, isTTF=True)
+    builder.setupGlyphOrder(list(widths))
+    builder.setupGlyf(glyphs)
+    builder.setupHorizontalMetrics({name: (width, 0) for name, width in widths.items()})
+    return builder.font
+
+
+def outline(font: TTFont, name: str) -> list[tuple[float, float]]:
+    glyph = font["glyf"][name]
+    if glyph.numberOfContours == 0:
+        return []
+    return list(glyph.coordinates)
+
+
+class TestEngineNumpy(unittest.TestCase):
+    """vectorized passes against the per-glyph TransformPlan"""
+
+    def assertSameFont(self, actual: TTFont, expected: TTFont) -> None:
+        for name in expected.getGlyphOrder():
+            with self.subTest(name=name):
+                self.assertEqual(actual["hmtx"][name], expected["hmtx"][name])
+                for a, e in zip(outline(actual, name), outline(expected, name)):
+                    self.assertAlmostEqual(a[0], e[0], places=6)
+                    self.assertAlmostEqual(a[1], e[1], places=6)
+
+    def test_reshape(self) -> None:
+        """same outlines and widths as engine_fonttools.reshape"""
+        for full_width, baseline_shift in [(False, 0), (True, 98)]:
+            expected = create_test_font()
+            actual = copy.deepcopy(expected)
+
+            engine_fonttools.reshape(
+                expected, SHAPE_AS, SHAPE_TO, full_width, baseline_shift
+            )
+            engine_numpy.reshape(actual, SHAPE_AS, SHAPE_TO, full_width, baseline_shift)
+            self.assertSameFont(actual, expected)
+
+    def test_italicize(self) -> None:
+        """same outlines and widths as engine_fonttools.italicize"""
+        expected = create_test_font()
+        actual = copy.deepcopy(expected)
+
+        engine_fonttools.italicize(expected, math.radians(9))
+        engine_numpy.italicize(actual, math.radians(9))
+        self.assertSameFont(actual, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import json
+import unittest
+from pathlib import Path
+
+from fontTools.ttLib import TTFont
+
+from src.engine_fonttools import build_pennywort_fonttools
+from src.parameter import Parameter
+
+SOURCE_FONTS_DIR = Path("./tmp")
+PARAMETER_FILE = Path("./parameters/Pennywort-Regular.json")
+REFERENCE_FONT = Path("./dist/Pennywort-Regular.ttf")
+
+# outlines are rounded to integers by both engines, at different steps
+TOLERANCE = 2
+
+
+def glyph_metrics(font: TTFont, char: str) -> tuple[int, ...]:
+    name = font.getBestCmap()[ord(char)]
+    glyph = font["glyf"][name]
+    glyph.recalcBounds(font["glyf"])
+    width, _ = font["hmtx"][name]
+    if glyph.numberOfContours == 0:
+        return (width, 0, 0, 0, 0)
+
+    return (width, glyph.xMin, glyph.yMin, glyph.xMax, glyph.yMax)
+
+
+def sources_exist() -> bool:
+    with open(PARAMETER_FILE) as f:
+        parameter = json.load(f)
+    return all(
+        (SOURCE_FONTS_DIR / parameter[font]["source"]).exists()
+        for font in ["hack", "bizud", "nerd"]
+    )
+
+
+@unittest.skipUnless(REFERENCE_FONT.exists(), "run `make build` first")
+@unittest.skipUnless(sources_exist(), f"source fonts missing in {SOURCE_FONTS_DIR}")
+class TestEngineParity(unittest.TestCase):
+    """fontTools engine against the fontforge build"""
+
+    def test_parity(self) -> None:
+        """same coverage, widths and bounding boxes"""
+        with open(PARAMETER_FILE) as f:
+            parameter = Parameter.from_dict(json.load(f))
+
+        expected = TTFont(str(REFERENCE_FONT))
+        actual = build_pennywort_fonttools(
+            parameter,
+            SOURCE_FONTS_DIR,
+            "1.000",
+            None,
+            None,
+        )
+
+        self.assertEqual(
+            set(actual.getBestCmap()),
+            set(expected.getBestCmap()),
+        )
+        for char in ["a", "m", "0", "|", "あ", "漢", "\u3000", "\ue0b0"]:
+            with self.subTest(char=char):
+                actual_metrics = glyph_metrics(actual, char)
+                expected_metrics = glyph_metrics(expected, char)
+                self.assertEqual(actual_metrics[0], expected_metrics[0])
+                for a, e in zip(actual_metrics[1:], expected_metrics[1:]):
+                    self.assertAlmostEqual(a, e, delta=TOLERANCE)
+
+
+if __name__ == "__main__":
+    unittest.main()
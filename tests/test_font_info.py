@@ -0,0 +1,51 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from fontTools.fontBuilder import FontBuilder
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+
+from src.font_info import read_font_info
+
+
+class TestFontInfo(unittest.TestCase):
+    """test metadata-only font reader"""
+
+    def test_read_font_info(self) -> None:
+        """names, metrics and widths by codepoint"""
+        builder = FontBuilder(1080, isTTF=True)
+        builder.setupGlyphOrder([".notdef", "a", "kanji"])
+        builder.setupCharacterMap({ord("a"): "a", ord("漢"): "kanji"})
+        builder.setupGlyf(
+            {name: TTGlyphPen(None).glyph() for name in [".notdef", "a", "kanji"]}
+        )
+        builder.setupHorizontalMetrics(
+            {".notdef": (540, 0), "a": (540, 0), "kanji": (1080, 0)}
+        )
+        builder.setupHorizontalHeader(ascent=864, descent=-216)
+        builder.setupNameTable(
+            {
+                "familyName": "Test",
+                "styleName": "Regular",
+                "fullName": "Test Regular",
+                "psName": "Test-Regular",
+            }
+        )
+        builder.setupOS2(sTypoAscender=864, sTypoDescender=-216)
+        builder.setupPost()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "Test-Regular.ttf"
+            builder.save(str(path))
+            info = read_font_info(path)
+
+        self.assertEqual(info.fontname, "Test-Regular")
+        self.assertEqual(info.fullname, "Test Regular")
+        self.assertEqual((info.em, info.ascent, info.descent), (1080, 864, 216))
+        self.assertEqual(info.codepoints, [ord("a"), ord("漢")])
+        self.assertEqual(info.widths, [540, 1080])
+        self.assertEqual(info.widths_by_codepoint[ord("漢")], 1080)
+
+
+if __name__ == "__main__":
+    unittest.main()
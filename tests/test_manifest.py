@@ -0,0 +1,55 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.manifest import BuildManifest, read_env
+
+
+class TestManifest(unittest.TestCase):
+    """test build manifest"""
+
+    def test_check(self) -> None:
+        """rebuild only when an input changed"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = Path(tmp_dir) / "font.ttf"
+            manifest = BuildManifest(Path(tmp_dir) / "manifest.json")
+            inputs = {"parameter": "a", "code": "b"}
+
+            self.assertEqual(manifest.check(output, inputs), "output missing")
+            output.write_bytes(b"")
+            self.assertEqual(manifest.check(output, inputs), "not in manifest")
+
+            manifest.record(output, inputs)
+            manifest.save()
+            manifest = BuildManifest(Path(tmp_dir) / "manifest.json")
+            self.assertIsNone(manifest.check(output, inputs))
+            self.assertEqual(
+                manifest.check(output, {"parameter": "c", "code": "b"}),
+                "changed parameter",
+            )
+
+    def test_peak_rss(self) -> None:
+        """peak RSS survives a reload, unknown until recorded"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = Path(tmp_dir) / "font.ttf"
+            manifest = BuildManifest(Path(tmp_dir) / "manifest.json")
+            self.assertIsNone(manifest.peak_rss(output))
+
+            manifest.record(output, {"code": "b"}, peak_rss=2048)
+            manifest.save()
+            manifest = BuildManifest(Path(tmp_dir) / "manifest.json")
+            self.assertEqual(manifest.peak_rss(output), 2048)
+
+    def test_read_env(self) -> None:
+        """parse .env"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            env_file = Path(tmp_dir) / ".env"
+            env_file.write_text("# comment\nVERSION=1.000\n\nHACK_VERSION=v3.003\n")
+            self.assertEqual(
+                read_env(env_file),
+                {"VERSION": "1.000", "HACK_VERSION": "v3.003"},
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+
+from fontforge import font as Font
+
+from src.modify_bizud import (
+    embolden,
+    embolden_glyph,
+    fit_glyph,
+    modify_bizud_upright,
+    modify_zenkaku_space,
+)
+from src.parameter import Coverage, GlyphShape
+from src.utils import (
+    create_font,
+    draw_square,
+    dump_outline,
+    has_glyphs,
+    remove_uncovered,
+)
+
+KANJI = 0x4E00
+SHAPE_AS = GlyphShape(ascent=880, descent=120, half_width=500, full_width=1000)
+SHAPE_TO = GlyphShape(ascent=800, descent=200, half_width=450, full_width=900)
+
+
+def small_font() -> Font:
+    """Boxes of different sizes, some with holes, and one with a reference."""
+    font = create_font(encoding="UnicodeFull", ascent=880, descent=120)
+    for i in range(8):
+        glyph = font.createChar(KANJI + i)
+        draw_square(glyph.glyphPen(), (100 + 10 * i, 0), 400 + 50 * i, 700)
+        if i % 2:
+            draw_square(glyph.glyphPen(replace=False), (250, 200), 100, 300, True)
+        glyph.width = 1000
+
+    glyph = font.createChar(KANJI + 8)
+    glyph.addReference(font[KANJI].glyphname)
+    glyph.width = 1000
+    return font
+
+
+def composite_font() -> Font:
+    """`small_font` with a composite before the glyph it refers to."""
+    font = small_font()
+    glyph = font.createChar(KANJI - 1)
+    glyph.addReference(font[KANJI + 1].glyphname, (1, 0, 0, 1, 100, 50))
+    glyph.width = 1000
+    return font
+
+
+def old_order(font: Font, weight: float) -> None:
+    """Fit and changeWeight each glyph in turn, as the unsharded pass did."""
+    original_em = font.em
+    font.ascent = SHAPE_AS.ascent
+    font.descent = SHAPE_AS.descent
+    for glyph in font.glyphs():
+        target_width = fit_glyph(glyph, original_em, SHAPE_AS, SHAPE_TO)
+        if target_width is not None:
+            embolden_glyph(glyph, weight, target_width)
+
+
+class TestModifyBizud(unittest.TestCase):
+    """test BIZUD modification"""
+
+    def test_embolden_shards(self) -> None:
+        """sharded changeWeight matches the serial pass"""
+        fonts = []
+        for shards in [1, 2]:
+            font = small_font()
+            target_widths = {glyph.glyphname: 1000 for glyph in font.glyphs()}
+            embolden(font, target_widths, 30, shards)
+            fonts.append(font)
+
+        serial, sharded = fonts
+        original = small_font()
+        self.assertNotEqual(dump_outline(serial[KANJI]), dump_outline(original[KANJI]))
+        original.close()
+
+        for glyph in serial.glyphs():
+            other = sharded[glyph.glyphname]
+            self.assertEqual(other.width, glyph.width)
+            self.assertEqual(dump_outline(other), dump_outline(glyph))
+            self.assertEqual(other.boundingBox(), glyph.boundingBox())
+
+        for font in fonts:
+            font.close()
+
+    def test_composite_order(self) -> None:
+        """composites see the glyphs they refer to as the per-glyph pass did"""
+        expected = composite_font()
+        old_order(expected, 30)
+
+        for shards in [1, 2]:
+            font = composite_font()
+            modify_bizud_upright(font, SHAPE_AS, SHAPE_TO, False, 0, 30, shards)
+            for glyph in expected.glyphs():
+                other = font[glyph.glyphname]
+                self.assertEqual(other.width, glyph.width)
+                self.assertEqual(other.references, glyph.references)
+                self.assertEqual(dump_outline(other), dump_outline(glyph))
+                self.assertEqual(other.boundingBox(), glyph.boundingBox())
+            font.close()
+
+        expected.close()
+
+    def test_uncovered_zenkaku_space(self) -> None:
+        """a coverage without the geometric shapes keeps the space as is"""
+        font = create_font(encoding="UnicodeFull", ascent=880, descent=120)
+        for unicode in [0x25A1, 0x25C6, 0x3000]:
+            font.createChar(unicode).width = 1000
+        draw_square(font[0x25A1].glyphPen(), (100, 0), 800, 800)
+        draw_square(font[0x25C6].glyphPen(), (300, 200), 400, 400)
+
+        coverage = Coverage.from_dict({"exclude": [[0x25A0, 0x25FF]]})
+        remove_uncovered(font, coverage.covers)
+        modify_zenkaku_space(font)
+
+        self.assertFalse(has_glyphs(font, [0x25A1]))
+        self.assertEqual(len(font[0x3000].foreground), 0)
+        font.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+from fontforge import font as Font
+
+from src.modify_hack import modify_hack_upright
+from src.parameter import Coverage, GlyphShape
+from src.utils import create_font, draw_square, has_glyphs, remove_uncovered
+
+SHAPE = GlyphShape(ascent=1556, descent=492, half_width=1233, full_width=2466)
+
+
+def small_hack() -> Font:
+    """Boxes at the glyphs the Hack modifications read and change."""
+    font = create_font(encoding="UnicodeFull", ascent=1556, descent=492)
+    for unicode in [0x30, 0x61, 0x6D, 0x7C, 0xA6, 0xB7]:
+        glyph = font.createChar(unicode)
+        draw_square(glyph.glyphPen(), (200, 0), 800, 1100)
+        glyph.width = 1233
+
+    return font
+
+
+class TestModifyHack(unittest.TestCase):
+    """test Hack modification"""
+
+    def test_uncovered_m(self) -> None:
+        """a coverage without 'm' skips modify_m only"""
+        font = small_hack()
+        coverage = Coverage.from_dict({"exclude": [[0x6D, 0x6D]]})
+        remove_uncovered(font, coverage.covers)
+        zero = font[0x30].boundingBox()
+
+        modify_hack_upright(font, SHAPE, SHAPE)
+
+        self.assertFalse(has_glyphs(font, [0x6D]))
+        self.assertTrue(has_glyphs(font, [0x30, 0x61, 0x7C]))
+        # the dotted zero is still drawn
+        self.assertNotEqual(font[0x30].boundingBox(), zero)
+        font.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
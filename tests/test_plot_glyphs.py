@@ -0,0 +1,54 @@
+import struct
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.plot_glyphs import create_sheet_cells, plot_contact_sheets
+from src.utils import create_font, draw_square
+
+
+def png_size(path: Path) -> tuple[int, int]:
+    width, height = struct.unpack(">II", path.read_bytes()[16:24])
+    return width, height
+
+
+class TestPlotGlyphs(unittest.TestCase):
+    """test contact sheets"""
+
+    def test_contact_sheets(self) -> None:
+        """one cell per glyph, pages of ncols x nrows cells"""
+        font = create_font(encoding="UnicodeFull", ascent=800, descent=200)
+        for i in range(5):
+            glyph = font.createChar(0x41 + i)
+            if i:
+                draw_square(glyph.glyphPen(), (100, 0), 400, 700)
+            glyph.width = 600
+        glyphs = [font[0x41 + i] for i in range(5)]
+
+        cells = create_sheet_cells(glyphs)
+        self.assertEqual(
+            [cell.label for cell in cells], [hex(0x41 + i) for i in range(5)]
+        )
+        self.assertEqual([cell.width for cell in cells], [600] * 5)
+        self.assertIsNone(cells[0].path)
+        self.assertIsNotNone(cells[1].path)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fname_format = str(Path(tmp_dir) / "sheet-{page:03}.png")
+            fnames = plot_contact_sheets(
+                glyphs, fname_format, ncols=2, nrows=2, cell_inches=0.5, jobs=1
+            )
+            self.assertEqual(
+                [Path(fname).name for fname in fnames],
+                ["sheet-000.png", "sheet-001.png"],
+            )
+
+            # 2 columns of 50 px, 2 rows then 1 row of 62.5 px at 100 dpi
+            self.assertEqual(png_size(Path(fnames[0])), (100, 125))
+            self.assertEqual(png_size(Path(fnames[1])), (100, 62))
+
+        font.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
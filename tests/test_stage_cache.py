@@ -0,0 +1,34 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.parameter import GlyphShape
+from src.stage_cache import StageCache, hash_config
+
+
+class TestStageCache(unittest.TestCase):
+    """test stage cache keys and eviction"""
+
+    def test_hash_config(self) -> None:
+        """dataclasses hash as their fields"""
+        shape = GlyphShape(ascent=864, descent=216, half_width=648, full_width=1296)
+        fields = {"ascent": 864, "descent": 216, "half_width": 648, "full_width": 1296}
+        self.assertEqual(hash_config(shape), hash_config(fields))
+
+    def test_evict(self) -> None:
+        """least recently used first, never the entry just stored"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = StageCache(Path(tmp_dir), max_size=250)
+            paths = [cache.path_of(f"stage-{i}") for i in range(3)]
+            for i, path in enumerate(paths):
+                path.write_bytes(b"x" * 100)
+                os.utime(path, (i, i))
+
+            cache.evict(keep=paths[0])
+            self.assertEqual([p.exists() for p in paths], [True, False, True])
+
+            big = cache.path_of("stage-big")
+            big.write_bytes(b"x" * 300)
+            cache.evict(keep=big)
+            self.assertEqual([p.exists() for p in [*paths, big]], [False] * 3 + [True])
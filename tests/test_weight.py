@@ -1,29 +1,58 @@
 import unittest
+from pathlib import Path
 
-import fontforge
-from fontforge import font as Font
+import numpy as np
+from fontTools.ttLib import TTFont
 
-from src.utils import calc_actual_size, draw_square
+from src.stem_weight import analyze_font, glyph_edges, print_summaries, stem_at
 
 
-def calc_weight(font: Font, unicode: int, rel_position: float = 1 / 2) -> float | None:
-    if unicode not in font:
+def calc_weight(
+    font: TTFont,
+    unicode: int,
+    rel_position: float = 1 / 2,
+) -> float | None:
+    cmap = font.getBestCmap()
+    if unicode not in cmap:
         return None
 
-    _, height = calc_actual_size(font[unicode])
-    font.selection.select(unicode)
-    pen = font[unicode].glyphPen(replace=False)
-    draw_square(pen, (0, height * rel_position), font[unicode].width, 1)
-    font.intersect()
-    font.selection.none()
-    weight, _ = calc_actual_size(font[unicode])
+    glyph_set = font.getGlyphSet()
+    width, _ = font["hmtx"][cmap[unicode]]
+    edges = glyph_edges(glyph_set[cmap[unicode]], glyph_set)
+    return stem_at(edges, rel_position, width)
 
-    return weight
+
+def rectangle(left: float, bottom: float, right: float, top: float) -> np.ndarray:
+    return np.array(
+        [
+            (left, bottom, right, bottom),
+            (right, bottom, right, top),
+            (right, top, left, top),
+            (left, top, left, bottom),
+        ]
+    )
 
 
 class TestWeight(unittest.TestCase):
     """test weight"""
 
+    def test_stem_at(self) -> None:
+        """measure across all strokes, at a height above the baseline"""
+        # a 100 wide stem up to 400 under a 300 wide box, descending to -200
+        edges = np.concatenate(
+            [rectangle(0, -200, 100, 400), rectangle(0, 400, 300, 800)]
+        )
+        self.assertEqual(stem_at(edges, 3 / 10), 100)
+        self.assertEqual(stem_at(edges, 1 / 2), 300)
+
+        # two stems with a gap, clipped to the advance width
+        edges = np.concatenate(
+            [rectangle(-50, 0, 100, 1000), rectangle(300, 0, 400, 1000)]
+        )
+        self.assertEqual(stem_at(edges, 1 / 2), 450)
+        self.assertEqual(stem_at(edges, 1 / 2, width=350), 350)
+        self.assertIsNone(stem_at(edges, 2))
+
     def test_weight(self) -> None:
         """calculate weight"""
         font_files = [
@@ -31,13 +60,31 @@ class TestWeight(unittest.TestCase):
             "./dist/Pennywort-Bold.ttf",
         ]
 
+        weights = []
         for path in font_files:
-            font = fontforge.open(path)
+            font = TTFont(path, lazy=True)
 
+            en = calc_weight(font, ord("l"))
+            jp = calc_weight(font, ord("し"), 2 / 3)
             print()
-            print(font.fullname)
-            print("EN:", calc_weight(font, ord("l")))
-            print("JP:", calc_weight(font, ord("し"), 2 / 3))
+            print(font["name"].getDebugName(4))
+            print("EN:", en)
+            print("JP:", jp)
+            assert en is not None and jp is not None
+            self.assertGreater(en, 0)
+            self.assertGreater(jp, 0)
+            weights.append((en, jp))
+
+            summaries = analyze_font(Path(path), sample=500)
+            print_summaries(Path(path), summaries)
+            for summary in summaries:
+                self.assertGreater(summary.glyphs, 0)
+                self.assertGreater(summary.vertical[1], 0)
+                self.assertGreater(summary.horizontal[1], 0)
+
+        (regular_en, regular_jp), (bold_en, bold_jp) = weights
+        self.assertGreater(bold_en, regular_en)
+        self.assertGreater(bold_jp, regular_jp)
 
 
 if __name__ == "__main__":